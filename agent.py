@@ -6,18 +6,17 @@ LiveKit Cloud compatible (livekit-agents >= 1.2.0)
 import os
 import sys
 import json
+import time
 import logging
 import asyncio
 from datetime import datetime
+from functools import lru_cache
+from typing import Tuple
 from dotenv import load_dotenv
 
-# Add current directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
-from livekit.agents import WorkerOptions, cli, JobContext
+from livekit.agents import WorkerOptions, cli, JobContext, JobProcess
 from livekit.agents.voice import Agent, AgentSession, room_io
-from livekit.agents.llm import ChatMessage
-from livekit.plugins import deepgram, openai
+from livekit.agents.llm import ChatContext
 
 
 from src.tools.appointments import (
@@ -26,26 +25,46 @@ from src.tools.appointments import (
     book_appointment,
     cancel_appointment,
     reschedule_appointment,
+    get_current_time,
+    drain_background_tasks,
     _session_id_context,
 )
 from src.config.prompts import get_agent_instruction, get_session_instruction
-from src.config import PromptConfig
+from src.config import PromptConfig, PROMPT_CONFIG, AGENT_SESSION_CONFIG, get_zoneinfo
 from src.services.database import get_db
+from src.services.plugins import get_stt, get_vad, get_llm, get_tts, get_noise_cancellation
 from src.models import initialize_memo, clear_memo
 
+# ---------------------------------------------------------------------------
+# EVENT LOOP
+# ---------------------------------------------------------------------------
+
+# Use libuv's event loop for the worker and its job processes when available
+if sys.platform != "win32":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
 # ---------------------------------------------------------------------------
 # ENV & LOGGING
 # ---------------------------------------------------------------------------
 
 load_dotenv()
 
+# The format doesn't use thread/process fields, so skip collecting them per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO"),
     format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
 )
 logger = logging.getLogger("dental-agent")
 
-REQUIRED_ENV_VARS = [
+REQUIRED_ENV_VARS = (
     "LIVEKIT_URL",
     "LIVEKIT_API_KEY",
     "LIVEKIT_API_SECRET",
@@ -57,23 +76,27 @@ REQUIRED_ENV_VARS = [
     "DB_PASSWORD",
     "CALCOM_API_KEY",
     "CALCOM_EVENT_TYPE_ID"
-]
+)
+
+# Resolved once at import, after load_dotenv(); the environment doesn't change afterwards
+_MISSING_ENV_VARS = tuple(v for v in REQUIRED_ENV_VARS if not os.environ.get(v))
 
 def validate_environment() -> None:
-    missing = [v for v in REQUIRED_ENV_VARS if not os.getenv(v)]
-    if missing:
-        raise EnvironmentError(f"Missing environment variables: {', '.join(missing)}")
+    if _MISSING_ENV_VARS:
+        raise EnvironmentError(f"Missing environment variables: {', '.join(_MISSING_ENV_VARS)}")
 
 # ---------------------------------------------------------------------------
 # CLINIC INFO
 # ---------------------------------------------------------------------------
 
+CLINIC_CONFIG_PATH = "clinic_config.json"
+
 def get_clinic_information() -> str:
     try:
-        return get_session_instruction("clinic_config.json")
+        return get_session_instruction(CLINIC_CONFIG_PATH)
     except Exception as e:
         logger.error("Failed to load clinic config", exc_info=True)
-        cfg = PromptConfig()
+        cfg = PROMPT_CONFIG
         return (
             f"# {cfg.ORGANIZATION_NAME}\n\n"
             "Clinic information is temporarily unavailable.\n\n"
@@ -81,104 +104,197 @@ def get_clinic_information() -> str:
         )
 
 
+@lru_cache(maxsize=1)
+def _build_instructions(config_mtime: float, today: str) -> Tuple[str, str]:
+    return get_agent_instruction(), get_clinic_information()
+
+
+def build_instructions() -> Tuple[str, str]:
+    """
+    Return (agent instruction, clinic information), rebuilt only when the
+    clinic config changes on disk or the clinic's calendar date rolls over.
+
+    The two blocks are sent as separate system messages and kept
+    byte-identical across sessions, so the LLM provider can reuse its
+    prompt cache for the long clinic-information prefix.
+    """
+    try:
+        config_mtime = os.stat(CLINIC_CONFIG_PATH).st_mtime
+    except OSError:
+        config_mtime = 0.0
+    today = datetime.now(get_zoneinfo(PROMPT_CONFIG.TIMEZONE)).date().isoformat()
+    return _build_instructions(config_mtime, today)
+
+# ---------------------------------------------------------------------------
+# AGENT FACTORY
+# ---------------------------------------------------------------------------
+
+AGENT_TOOLS = [
+    get_availability,
+    check_existing_appointments,
+    book_appointment,
+    cancel_appointment,
+    reschedule_appointment,
+    get_current_time,
+]
+
+
+def build_agent(config: PromptConfig, instructions: str, clinic_information: str) -> Agent:
+    """
+    Build the receptionist Agent on the worker's shared plugin instances.
+    This is the only place STT/LLM/TTS are attached, so a session never
+    holds a second copy of the model clients.
+    """
+    # Clinic details follow the agent instruction as their own system message
+    chat_ctx = ChatContext.empty()
+    chat_ctx.add_message(role="system", content=clinic_information)
+    return Agent(
+        instructions=instructions,
+        chat_ctx=chat_ctx,
+        stt=get_stt(),
+        llm=get_llm(config.LLM_MODEL, config.LLM_TEMPERATURE),
+        tts=get_tts(config.TTS_VOICE),  # only OpenAI TTS supported
+        tools=AGENT_TOOLS,
+    )
+
+# ---------------------------------------------------------------------------
+# WORKER PREWARM
+# ---------------------------------------------------------------------------
+
+def prewarm(proc: JobProcess) -> None:
+    """
+    Worker prewarm hook: build the plugin clients and system instruction
+    before the first job is assigned to this process.
+    """
+    config = PROMPT_CONFIG
+    get_stt()
+    proc.userdata["vad"] = get_vad()
+    get_llm(config.LLM_MODEL, config.LLM_TEMPERATURE)
+    get_tts(config.TTS_VOICE)
+    proc.userdata["nc"] = get_noise_cancellation()
+    build_instructions()
+    logger.info("Worker process prewarmed")
+
+
 # AGENT ENTRYPOINT (NEW LIVEKIT MODEL)
 # ---------------------------------------------------------------------------
 
+# Upper bound on the post-session analytics refresh during job shutdown
+ANALYTICS_TIMEOUT_SECONDS = 10
+# Upper bound on waiting for tool background writes before the session row is closed
+BACKGROUND_DRAIN_TIMEOUT_SECONDS = 5
+
 async def dental_clinic_agent(ctx: JobContext):
     """
     LiveKit Cloud entrypoint.
     One function = one agent worker.
+    Environment is validated once in __main__ before the worker starts.
     """
-    validate_environment()
-
     db = None
     session = None
     session_id = None
-    start_time = datetime.utcnow()
+    start_time = time.monotonic()  # wall-clock times are stamped by the DB layer
 
     try:
+        config = PROMPT_CONFIG
+
+        greeting = (
+            f"Hello! I'm {config.RECEPTIONIST_NAME} from "
+            f"{config.ORGANIZATION_NAME}. How may I help you?"
+        )
+
+        def _open_session():
+            # Session row + greeting log go in one transaction
+            service = get_db()
+            return service, service.create_session(ctx.job.room.name, greeting)
+
+        # Overlap the room connect with the blocking instruction build and
+        # session INSERT, which run in worker threads
         logger.info("Connecting to room...")
-        await ctx.connect()
+        connected, instructions, opened = await asyncio.gather(
+            ctx.connect(),
+            asyncio.to_thread(build_instructions),
+            asyncio.to_thread(_open_session),
+            return_exceptions=True,
+        )
+
+        # Keep the session row even if the connect failed, so finally can close it
+        if not isinstance(opened, BaseException):
+            db, session_id = opened
+            logger.info("DB session created: %s", session_id)
+
+            # Analytics are non-critical: refresh them from a shutdown callback
+            # so teardown doesn't wait on another DB round-trip. Registered now,
+            # while the job is live, so it's in place before shutdown starts.
+            async def _update_analytics() -> None:
+                if not (db and session_id):
+                    return
+                try:
+                    await asyncio.wait_for(
+                        asyncio.to_thread(db.update_session_analytics),
+                        timeout=ANALYTICS_TIMEOUT_SECONDS,
+                    )
+                    logger.debug("Session analytics updated successfully")
+                except Exception as e:
+                    # Don't let analytics failures crash the agent
+                    logger.warning("Failed to update session analytics: %r", e)
+
+            ctx.add_shutdown_callback(_update_analytics)
+        for result in (connected, instructions, opened):
+            if isinstance(result, BaseException):
+                raise result
+
+        # Context vars are set here, in the entrypoint task, so the session and
+        # tool-call tasks spawned below inherit them
+        _session_id_context.set(session_id)
+        initialize_memo()
 
         # Wait for the first participant to join
         participant = await ctx.wait_for_participant()
-        logger.info(f"Connected to participant: {participant.identity}")
+        logger.info("Connected to participant: %s", participant.identity)
 
-        db = get_db()
-        session_id = db.create_session(ctx.room.name)
-        _session_id_context.set(session_id)
+        # Wake the session loop as soon as the room, the caller, or the job goes away
+        disconnected = asyncio.Event()
 
-        logger.info(f"DB session created: {session_id}")
+        def _on_participant_disconnected(p) -> None:
+            if p.identity == participant.identity:
+                disconnected.set()
 
-        initialize_memo()
+        async def _on_shutdown() -> None:
+            disconnected.set()
 
-        config = PromptConfig()
+        ctx.room.on("disconnected", lambda *_: disconnected.set())
+        ctx.room.on("participant_disconnected", _on_participant_disconnected)
+        ctx.add_shutdown_callback(_on_shutdown)
 
-        full_instruction = (
-            f"{get_agent_instruction()}\n\n{get_clinic_information()}"
-        )
+        agent = build_agent(config, *instructions)
 
-        # Select TTS provider (only OpenAI supported)
-        tts_plugin = openai.TTS(voice=config.TTS_VOICE)
-
-        # Create the Agent instance with all its components
-        agent = Agent(
-            instructions=full_instruction,
-            stt=deepgram.STT(
-                model="nova-2",
-                language="en",
-                smart_format=True,
-                interim_results=True,
-            ),
-            llm=openai.LLM(
-                model=config.LLM_MODEL,
-                temperature=config.LLM_TEMPERATURE,
-            ),
-            tts=tts_plugin,
-            tools=[
-                get_availability,
-                check_existing_appointments,
-                book_appointment,
-                cancel_appointment,
-                reschedule_appointment,
-            ]
+        # Initialize the session and start it for this participant.
+        # STT/LLM/TTS live on the Agent only; the session just adds VAD.
+        session = AgentSession(
+            vad=ctx.proc.userdata.get("vad") or get_vad(),
+            **AGENT_SESSION_CONFIG,
         )
-
-        # Initialize the session and start it for this participant
-        session = AgentSession()
         await session.start(
             agent,
             room=ctx.room,
             room_input_options=room_io.RoomInputOptions(
-                participant_identity=participant.identity
+                participant_identity=participant.identity,
+                noise_cancellation=ctx.proc.userdata.get("nc"),
             )
         )
 
 
-        greeting = (
-            f"Hello! I'm {config.RECEPTIONIST_NAME} from "
-            f"{config.ORGANIZATION_NAME}. How may I help you?"
-        )
-
-        await session.say(greeting)
-
-        try:
-            db.log_message(
-                session_id=session_id,
-                speaker="agent",
-                message_text=greeting,
-                user_id=None,
-                audio_duration=None,
-            )
-        except Exception:
-            logger.warning("Failed to log greeting", exc_info=True)
+        # Don't await playout: the TTS node already synthesizes the greeting
+        # sentence by sentence, so startup continues while it plays.
+        session.say(greeting, allow_interruptions=True)
 
         logger.info("Agent started successfully")
 
         # Keep the session alive until the room disconnects or the job is cancelled
         logger.info("Agent session running...")
-        while ctx.room.isconnected:
-            await asyncio.sleep(1)
+        if ctx.room.isconnected:
+            await disconnected.wait()
 
     except Exception as e:
         logger.error("Agent crashed", exc_info=True)
@@ -191,33 +307,31 @@ async def dental_clinic_agent(ctx: JobContext):
                 await session.aclose()
                 logger.info("Agent session closed")
             except Exception as e:
-                logger.warning(f"Error closing agent session: {e}")
+                logger.warning("Error closing agent session: %s", e)
 
         # Clear conversation memo to prevent memory leaks
         try:
             clear_memo()
-            logger.info(f"Conversation memo cleared for session {session_id if session_id else 'unknown'}")
+            logger.info("Conversation memo cleared for session %s", session_id or "unknown")
+        except Exception as e:
+            logger.warning("Failed to clear memo: %s", e)
+        
+        # Let booking/reschedule records started by tools land before the session ends
+        try:
+            await drain_background_tasks(BACKGROUND_DRAIN_TIMEOUT_SECONDS)
         except Exception as e:
-            logger.warning(f"Failed to clear memo: {e}")
+            logger.warning("Failed to drain background tasks: %s", e)
         
         if db and session_id:
-            duration = int((datetime.utcnow() - start_time).total_seconds())
-            try:
-                db.end_session(session_id, duration_seconds=duration)
-                logger.info(f"Session {session_id} ended (duration: {duration}s)")
-            except Exception as e:
-                logger.error(f"Failed to end DB session {session_id}: {e}")
-            
-            # Try to update analytics separately with additional error handling
+            duration = int(time.monotonic() - start_time)
             try:
-                db.update_session_analytics()
-                logger.debug("Session analytics updated successfully")
+                await asyncio.to_thread(db.end_session, session_id, duration)
+                logger.info("Session %s ended (duration: %ss)", session_id, duration)
             except Exception as e:
-                # Don't let analytics failures crash the agent
-                logger.warning(f"Failed to update session analytics: {e}")
+                logger.error("Failed to end DB session %s: %s", session_id, e)
 
         elif session_id:
-            logger.info(f"Session {session_id} ended (no DB connection for cleanup)")
+            logger.info("Session %s ended (no DB connection for cleanup)", session_id)
         
         # Final shutdown call to ensure room disconnection
         try:
@@ -236,6 +350,7 @@ if __name__ == "__main__":
         cli.run_app(
             WorkerOptions(
                 entrypoint_fnc=dental_clinic_agent,
+                prewarm_fnc=prewarm,
                 agent_name=os.getenv("LIVEKIT_AGENT_NAME", "toothfairy-dental-agent")
             )
         )
@@ -4,20 +4,34 @@ Configuration package for dental clinic agent
 
 from .settings import (
     PromptConfig,
+    PROMPT_CONFIG,
     DEEPGRAM_CONFIG,
+    VAD_CONFIG,
+    AGENT_SESSION_CONFIG,
     DB_POOL_CONFIG,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    ADMIN_PASSWORD,
+    REDIS_CONFIG,
     LIVEKIT_AGENT_CONFIG,
     load_clinic_config,
     get_current_time,
+    get_zoneinfo,
     ZONEINFO_AVAILABLE
 )
 
 __all__ = [
     'PromptConfig',
+    'PROMPT_CONFIG',
     'DEEPGRAM_CONFIG',
+    'VAD_CONFIG',
+    'AGENT_SESSION_CONFIG',
     'DB_POOL_CONFIG',
+    'DB_POOL_ACQUIRE_TIMEOUT',
+    'ADMIN_PASSWORD',
+    'REDIS_CONFIG',
     'LIVEKIT_AGENT_CONFIG',
     'load_clinic_config',
     'get_current_time',
+    'get_zoneinfo',
     'ZONEINFO_AVAILABLE'
 ]
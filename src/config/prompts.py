@@ -11,42 +11,62 @@ Usage:
     context_prompt = get_session_instruction()
 """
 
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, time as dt_time, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import json
+import time
 
-from .settings import PromptConfig, load_clinic_config, get_current_time, ZONEINFO_AVAILABLE
+from .settings import PROMPT_CONFIG, load_clinic_config, get_zoneinfo, ZONEINFO_AVAILABLE
 
-try:
-    from zoneinfo import ZoneInfo
-except ImportError:
-    ZoneInfo = None
 
+# Doctor list per config path, tied to the parsed config object it came from
+_DOCTORS_CACHE: Dict[str, Tuple[dict, tuple]] = {}
 
-def get_available_doctors(config_path: str = "clinic_config.json") -> list:
-    """Get list of available doctors from clinic configuration."""
+_DEFAULT_DOCTORS = ({
+    'name': 'Dr. David Mishra DDS, MDS (Oral & Maxillofacial Surgery)',
+    'specialization': 'Comprehensive dental care'
+},)
+
+
+def get_available_doctors(config_path: str = "clinic_config.json") -> tuple:
+    """
+    Get list of available doctors from clinic configuration.
+
+    Returned as a tuple and memoized until the clinic config is reloaded,
+    so callers must not mutate the doctor dicts.
+    """
     try:
         clinic_config = load_clinic_config(config_path)
-        doctors = []
-        
-        # Try to get doctors list if it exists
-        if 'doctors' in clinic_config and isinstance(clinic_config['doctors'], list):
-            doctors = clinic_config['doctors']
-        # Fallback: check for single doctor in 'doctor' field
-        elif 'doctor' in clinic_config:
-            doctor_info = clinic_config['doctor']
-            if isinstance(doctor_info, dict) and 'name' in doctor_info:
-                doctors = [doctor_info]
-            elif isinstance(doctor_info, list):
-                doctors = doctor_info
-        
-        return doctors
     except Exception as e:
         # If config can't be loaded, assume single default doctor
-        return [{
-            'name': 'Dr. David Mishra DDS, MDS (Oral & Maxillofacial Surgery)',
-            'specialization': 'Comprehensive dental care'
-        }]
+        return _DEFAULT_DOCTORS
+
+    cached = _DOCTORS_CACHE.get(config_path)
+    if cached and cached[0] is clinic_config:
+        return cached[1]
+
+    doctors = []
+    
+    # Try to get doctors list if it exists
+    if 'doctors' in clinic_config and isinstance(clinic_config['doctors'], list):
+        doctors = clinic_config['doctors']
+    # Fallback: check for single doctor in 'doctor' field
+    elif 'doctor' in clinic_config:
+        doctor_info = clinic_config['doctor']
+        if isinstance(doctor_info, dict) and 'name' in doctor_info:
+            doctors = [doctor_info]
+        elif isinstance(doctor_info, list):
+            doctors = doctor_info
+
+    doctors = tuple(doctors)
+    _DOCTORS_CACHE[config_path] = (clinic_config, doctors)
+    return doctors
+
+
+def clear_doctor_cache() -> None:
+    """Drop memoized doctor lists (they also refresh when the config file changes)."""
+    _DOCTORS_CACHE.clear()
 
 
 def should_ask_for_doctor() -> bool:
@@ -88,37 +108,50 @@ def get_default_doctor() -> str:
 # AGENT SYSTEM INSTRUCTION
 # ============================================================================
 
-def get_agent_instruction() -> str:
-    """
-    System-level instruction defining agent persona, rules, and tool usage.
-    """
-    config = PromptConfig()
-    
-    # Get today and tomorrow dates (cached approach)
-    try:
-        if ZoneInfo:
-            tz = ZoneInfo(config.TIMEZONE)
-            now = datetime.now(tz)
-        else:
-            now = datetime.now()
-        today = now.strftime("%A, %B %d, %Y")
-        tomorrow = (now + __import__('datetime').timedelta(days=1)).strftime("%A, %B %d, %Y")
-    except:
-        today = "today"
-        tomorrow = "tomorrow"
+# Memo formatter, resolved on first use
+_memo_fn = None
 
-    # Try to get memo context if available
-    memo_context = ""
-    try:
-        # Import here to avoid circular imports
-        from ..models.conversation import get_memo_context_for_prompt
-        memo_context = get_memo_context_for_prompt()
-        if memo_context:
-            memo_context = f"\n\n# CONVERSATION MEMORY CONTEXT:\n{memo_context}\n"
-    except ImportError:
-        pass
-
-    return f"""
+
+def _get_memo_fn():
+    """Resolve get_memo_context_for_prompt once (imported lazily to avoid circular imports)."""
+    global _memo_fn
+    if _memo_fn is None:
+        try:
+            from ..models.conversation import get_memo_context_for_prompt
+            _memo_fn = get_memo_context_for_prompt
+        except ImportError:
+            _memo_fn = lambda: ""
+    return _memo_fn
+
+
+# (next local midnight as epoch seconds, today, tomorrow) per timezone
+_DATE_CACHE: Dict[str, Tuple[float, str, str]] = {}
+
+
+def _get_prompt_dates(timezone_name: str) -> Tuple[str, str]:
+    """Get today's and tomorrow's date strings in the clinic timezone."""
+    cached = _DATE_CACHE.get(timezone_name)
+    if cached and time.time() < cached[0]:
+        return cached[1], cached[2]
+
+    # get_zoneinfo() gives None (naive local time) when zoneinfo is unavailable
+    now = datetime.now(get_zoneinfo(timezone_name))
+    next_day = now + timedelta(days=1)
+    today = now.strftime("%A, %B %d, %Y")
+    tomorrow = next_day.strftime("%A, %B %d, %Y")
+
+    rollover = datetime.combine(next_day.date(), dt_time.min, tzinfo=now.tzinfo)
+    _DATE_CACHE[timezone_name] = (rollover.timestamp(), today, tomorrow)
+    return today, tomorrow
+
+
+# Placeholder for the per-turn memo block inside the cached template
+_MEMO_CONTEXT_SLOT = "{MEMO_CONTEXT_SLOT}"
+
+
+# Formatted in two passes (persona at import, dates per day); the persona values
+# are brace-escaped by _escape_braces so they survive the second pass
+_AGENT_INSTRUCTION_TEMPLATE = """
 # CRITICAL CONTEXT: Current Dates
 **Today: {today}**
 **Tomorrow: {tomorrow}**
@@ -126,17 +159,18 @@ def get_agent_instruction() -> str:
 When user says "tomorrow", use {tomorrow}.
 When user says "today", use {today}.
 When user says next Monday/Tuesday, calculate FROM today.
+If you need the current time of day, call get_current_time().
 {memo_context}
 IMPORTANT:
 - For ANY clinic-related question (doctor, services, fees, address, timings, policies),
   USE ONLY information from SESSION_INSTRUCTION.
 - Do NOT use outside knowledge, assumptions, or internet memory.
 - If information is missing, reply exactly:
-  "{config.FALLBACK_MESSAGE}"
+  "{fallback_message}"
 
 # Persona
-You are a professional {config.ORGANIZATION_TYPE} receptionist named {config.RECEPTIONIST_NAME},
-working for {config.ORGANIZATION_NAME}.
+You are a professional {organization_type} receptionist named {receptionist_name},
+working for {organization_name}.
 
 # Context
 You are a real-time virtual receptionist assisting patients via voice.
@@ -260,7 +294,7 @@ Example conversation flow:
   • If user says: "Show available slots, my email is abc@xyz.com"
   • Agent should proactively call check_existing_appointments() to store email in memo
   • This prevents asking for email again during rescheduling/cancellation
-- All dates and times are in {config.TIMEZONE} ({config.TIMEZONE_ABBR})
+- All dates and times are in {timezone} ({timezone_abbr})
 
 # Date & Time Rules
 - All dates/times reference: TODAY is {today}, TOMORROW is {tomorrow}
@@ -274,60 +308,72 @@ Example conversation flow:
 """
 
 
-# ============================================================================
-# SESSION INSTRUCTION (CLINIC DATA)
-# ============================================================================
+def _escape_braces(value: str) -> str:
+    return value.replace("{", "{{").replace("}", "}}")
 
-def get_session_instruction(config_path: str = "clinic_config.json") -> str:
+
+# Persona fields are fixed at import (PromptConfig reads env in its class body),
+# so fill them in once and leave the date/memo placeholders for later passes
+_AGENT_PERSONA_TEMPLATE = _AGENT_INSTRUCTION_TEMPLATE.format_map({
+    "timezone": _escape_braces(PROMPT_CONFIG.TIMEZONE),
+    "timezone_abbr": _escape_braces(PROMPT_CONFIG.TIMEZONE_ABBR),
+    "organization_name": _escape_braces(PROMPT_CONFIG.ORGANIZATION_NAME),
+    "organization_type": _escape_braces(PROMPT_CONFIG.ORGANIZATION_TYPE),
+    "receptionist_name": _escape_braces(PROMPT_CONFIG.RECEPTIONIST_NAME),
+    "fallback_message": _escape_braces(PROMPT_CONFIG.FALLBACK_MESSAGE),
+    "today": "{today}",
+    "tomorrow": "{tomorrow}",
+    "memo_context": "{memo_context}",
+})
+
+
+@lru_cache(maxsize=4)
+def _build_agent_instruction_template(today: str, tomorrow: str) -> str:
     """
-    Session-specific clinic information (single source of truth).
+    Render the instruction once per day; the memo block is left as a slot
+    because it changes every turn.
     """
+    return _AGENT_PERSONA_TEMPLATE.format_map({
+        "today": today,
+        "tomorrow": tomorrow,
+        "memo_context": _MEMO_CONTEXT_SLOT,
+    })
+
+
+def get_agent_instruction() -> str:
+    """
+    System-level instruction defining agent persona, rules, and tool usage.
+    """
+    config = PROMPT_CONFIG
+    
+    # Get today and tomorrow dates (cached approach)
     try:
-        clinic_config = load_clinic_config(config_path)
-        config = PromptConfig()
+        today, tomorrow = _get_prompt_dates(config.TIMEZONE)
+    except Exception:
+        today = "today"
+        tomorrow = "tomorrow"
 
-        doctor = clinic_config.get("doctor", {})
-        clinic = clinic_config.get("clinic", {})
-        services = clinic_config.get("services", [])
-        fees = clinic_config.get("fees", {})
-        policies = clinic_config.get("policies", {})
+    template = _build_agent_instruction_template(today, tomorrow)
 
-        services_text = "\n".join([f"- {service}" for service in services])
+    # Try to get memo context if available
+    memo_context = _get_memo_fn()()
+    if memo_context:
+        memo_context = f"\n\n# CONVERSATION MEMORY CONTEXT:\n{memo_context}\n"
 
-        fees_text = "\n".join([
-            f"- General Consultation: {fees.get('general_consultation', 'Contact clinic')}",
-            f"- Follow-up Visit: {fees.get('followup', 'Contact clinic')}",
-            f"- Emergency Consultation: {fees.get('emergency', 'Contact clinic')}",
-            f"- Surgical Consultation: {fees.get('surgical_consultation', 'Contact clinic')}"
-        ])
+    return template.replace(_MEMO_CONTEXT_SLOT, memo_context)
 
-        contact_text = "\n".join([
-            f"- Phone: {clinic.get('phone', 'Contact clinic')}",
-            f"- Emergency: {clinic.get('emergency', 'Contact clinic')}",
-            f"- Email: {clinic.get('email', 'Contact clinic')}",
-            f"- Website: {clinic.get('website', 'Contact clinic')}"
-        ])
 
-        policies_text = "\n".join([
-            "**Appointment Policies:**",
-            f"- {policies.get('appointment_info', 'Contact clinic for details')}",
-            f"- {policies.get('arrival_time', 'Please arrive on time')}",
-            f"- {policies.get('cancellation', 'Contact clinic for cancellation policy')}",
-            "",
-            "**Payment Methods:**",
-            f"- {policies.get('payment_methods', 'Contact clinic')}",
-            f"- {policies.get('insurance', 'Contact clinic')}",
-            "",
-            "**What to Bring:**",
-            f"- {policies.get('what_to_bring', 'Contact clinic')}"
-        ])
+# ============================================================================
+# SESSION INSTRUCTION (CLINIC DATA)
+# ============================================================================
 
-        return f"""
-# {config.ORGANIZATION_NAME} - Information Database
+# Rendered with str.format_map, so literal braces must be doubled
+_SESSION_INSTRUCTION_TEMPLATE = """
+# {organization_name} - Information Database
 
 ## Dentist Information
-**Name:** {doctor.get('name', 'Contact clinic')}
-**Specialization:** {doctor.get('specialization', 'Contact clinic')}
+**Name:** {doctor_name}
+**Specialization:** {doctor_specialization}
 
 📝 **Appointment Types Available:**
 - General Consultation & Checkup
@@ -348,10 +394,10 @@ def get_session_instruction(config_path: str = "clinic_config.json") -> str:
 {fees_text}
 
 ## Clinic Location
-{clinic.get('address', 'Contact clinic')}
+{address}
 
 ## Operating Hours
-{clinic.get('hours', 'Contact clinic')}
+{hours}
 
 ## Contact Information
 {contact_text}
@@ -365,12 +411,80 @@ IMPORTANT:
 - If information is missing, use fallback response
 - Do NOT infer or guess
 
-**Last Updated:** {get_current_time()}
-**Timezone:** {config.TIMEZONE} ({config.TIMEZONE_ABBR})
+**Timezone:** {timezone} ({timezone_abbr})
 """
 
+# Rendered clinic information per config path, tied to the parsed config it came from
+_SESSION_CACHE: Dict[str, Tuple[dict, str]] = {}
+
+
+def get_session_instruction(config_path: str = "clinic_config.json") -> str:
+    """
+    Session-specific clinic information (single source of truth).
+    Rendered once per clinic config version.
+    """
+    try:
+        clinic_config = load_clinic_config(config_path)
+        cached = _SESSION_CACHE.get(config_path)
+        if cached and cached[0] is clinic_config:
+            return cached[1]
+
+        config = PROMPT_CONFIG
+
+        doctor = clinic_config.get("doctor", {})
+        clinic = clinic_config.get("clinic", {})
+        services = clinic_config.get("services", [])
+        fees = clinic_config.get("fees", {})
+        policies = clinic_config.get("policies", {})
+
+        services_text = "\n".join(f"- {service}" for service in services)
+
+        fees_text = "\n".join([
+            f"- General Consultation: {fees.get('general_consultation', 'Contact clinic')}",
+            f"- Follow-up Visit: {fees.get('followup', 'Contact clinic')}",
+            f"- Emergency Consultation: {fees.get('emergency', 'Contact clinic')}",
+            f"- Surgical Consultation: {fees.get('surgical_consultation', 'Contact clinic')}"
+        ])
+
+        contact_text = "\n".join([
+            f"- Phone: {clinic.get('phone', 'Contact clinic')}",
+            f"- Emergency: {clinic.get('emergency', 'Contact clinic')}",
+            f"- Email: {clinic.get('email', 'Contact clinic')}",
+            f"- Website: {clinic.get('website', 'Contact clinic')}"
+        ])
+
+        policies_text = "\n".join([
+            "**Appointment Policies:**",
+            f"- {policies.get('appointment_info', 'Contact clinic for details')}",
+            f"- {policies.get('arrival_time', 'Please arrive on time')}",
+            f"- {policies.get('cancellation', 'Contact clinic for cancellation policy')}",
+            "",
+            "**Payment Methods:**",
+            f"- {policies.get('payment_methods', 'Contact clinic')}",
+            f"- {policies.get('insurance', 'Contact clinic')}",
+            "",
+            "**What to Bring:**",
+            f"- {policies.get('what_to_bring', 'Contact clinic')}"
+        ])
+
+        instruction = _SESSION_INSTRUCTION_TEMPLATE.format_map({
+            "organization_name": config.ORGANIZATION_NAME,
+            "doctor_name": doctor.get('name', 'Contact clinic'),
+            "doctor_specialization": doctor.get('specialization', 'Contact clinic'),
+            "services_text": services_text,
+            "fees_text": fees_text,
+            "address": clinic.get('address', 'Contact clinic'),
+            "hours": clinic.get('hours', 'Contact clinic'),
+            "contact_text": contact_text,
+            "policies_text": policies_text,
+            "timezone": config.TIMEZONE,
+            "timezone_abbr": config.TIMEZONE_ABBR,
+        })
+        _SESSION_CACHE[config_path] = (clinic_config, instruction)
+        return instruction
+
     except Exception as e:
-        config = PromptConfig()
+        config = PROMPT_CONFIG
         return f"""
 # {config.ORGANIZATION_NAME} - Information Database
 
@@ -379,6 +493,4 @@ Configuration error: {str(e)}
 Please contact clinic directly:
 {config.FALLBACK_MESSAGE}
 
----
-Last Updated: {get_current_time()}
 """
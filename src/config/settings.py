@@ -3,32 +3,42 @@ Configuration and Settings Module
 Centralized configuration for the dental clinic agent
 """
 
-from datetime import datetime
-from typing import Optional
-import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 import json
+import os
+import sys
+import time
 
 try:
     from zoneinfo import ZoneInfo
     ZONEINFO_AVAILABLE = True
 except ImportError:
+    ZoneInfo = None
     ZONEINFO_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 class PromptConfig:
     """Configuration class for prompt customization."""
 
-    # Receptionist Details
-    RECEPTIONIST_NAME: str = os.getenv("RECEPTIONIST_NAME", "Neha")
-    ORGANIZATION_NAME: str = os.getenv("ORGANIZATION_NAME", "ToothFairy Dental Clinic")
-    ORGANIZATION_TYPE: str = os.getenv("ORGANIZATION_TYPE", "dental clinic")
+    # Receptionist Details (persona strings are interned; they key the prompt caches)
+    RECEPTIONIST_NAME: str = sys.intern(os.getenv("RECEPTIONIST_NAME", "Neha"))
+    ORGANIZATION_NAME: str = sys.intern(os.getenv("ORGANIZATION_NAME", "ToothFairy Dental Clinic"))
+    ORGANIZATION_TYPE: str = sys.intern(os.getenv("ORGANIZATION_TYPE", "dental clinic"))
     
     # Wake Words for Voice Activation
-    WAKE_WORDS: list = ["neha", "hey neha", "hello neha", "neha please"]
+    WAKE_WORDS: frozenset = frozenset({"neha", "hey neha", "hello neha", "neha please"})
 
     # Timezone Configuration
-    TIMEZONE: str = os.getenv("TIMEZONE", "Asia/Kolkata")
-    TIMEZONE_ABBR: str = os.getenv("TIMEZONE_ABBR", "IST")
+    TIMEZONE: str = sys.intern(os.getenv("TIMEZONE", "Asia/Kolkata"))
+    TIMEZONE_ABBR: str = sys.intern(os.getenv("TIMEZONE_ABBR", "IST"))
 
     # Language Settings
     PRIMARY_LANGUAGE: str = os.getenv("PRIMARY_LANGUAGE", "English")
@@ -40,11 +50,18 @@ class PromptConfig:
     TTS_MODEL: str = os.getenv("TTS_MODEL", "tts-1")
     TTS_VOICE: str = os.getenv("TTS_VOICE", "nova")  # OpenAI voices: alloy, echo, fern, nova, onyx, shimmer
 
+    # Upper bound on the memo block injected into prompts and tool responses
+    MEMO_MAX_CHARS: int = int(os.getenv("MEMO_MAX_CHARS", "2000"))
+
     # Fallback Response
-    FALLBACK_MESSAGE: str = os.getenv(
+    FALLBACK_MESSAGE: str = sys.intern(os.getenv(
         "FALLBACK_MESSAGE",
         "I don't have that information right now, but I can connect you with our dental team who will assist further."
-    )
+    ))
+
+
+# Shared instance; all settings are class attributes read from env at import
+PROMPT_CONFIG = PromptConfig()
 
 
 # Deepgram STT Configuration
@@ -55,15 +72,45 @@ DEEPGRAM_CONFIG = {
     "interim_results": True
 }
 
+# Silero VAD Configuration (loaded once per worker in prewarm)
+VAD_CONFIG = {
+    "min_speech_duration": float(os.getenv("VAD_MIN_SPEECH_DURATION", "0.02")),
+    "min_silence_duration": float(os.getenv("VAD_MIN_SILENCE_DURATION", "0.2"))
+}
+
+# AgentSession turn-taking Configuration
+AGENT_SESSION_CONFIG = {
+    "preemptive_generation": os.getenv("PREEMPTIVE_GENERATION", "true").lower() == "true",
+    "min_endpointing_delay": float(os.getenv("MIN_ENDPOINTING_DELAY", "0.05")),
+    "max_endpointing_delay": float(os.getenv("MAX_ENDPOINTING_DELAY", "3.0")),
+    "allow_interruptions": True,
+    "min_interruption_duration": float(os.getenv("MIN_INTERRUPTION_DURATION", "0.15"))
+}
+
 # Database Connection Pool Configuration
 DB_POOL_CONFIG = {
-    "pool_size": 5,
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),  # mysql-connector caps this at 32
     "pool_reset_session": True,
     "autocommit": False,
     "use_unicode": True,
     "charset": "utf8mb4"
 }
 
+# Seconds to wait for a free pooled connection before giving up
+DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+
+# Password for the admin_cleanup tool; no default, so the tool stays locked until one is set
+ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "")
+
+# Shared cache (optional): set REDIS_URL so every worker process reuses the
+# same Cal.com lookups; without it each process only caches in memory
+REDIS_CONFIG = {
+    "url": os.getenv("REDIS_URL", ""),
+    # Keep short: a slow cache must never cost more than the lookup it saves
+    "socket_timeout": float(os.getenv("REDIS_TIMEOUT", "0.25")),
+    "socket_connect_timeout": float(os.getenv("REDIS_TIMEOUT", "0.25"))
+}
+
 # livgit Agent Configuration
 LIVEKIT_AGENT_CONFIG = {
     "noise_cancellation_enabled": True,
@@ -74,36 +121,82 @@ LIVEKIT_AGENT_CONFIG = {
 }
 
 
+@lru_cache(maxsize=16)
+def get_zoneinfo(tz_name: str):
+    """Shared tzinfo for a zone name, or None when zoneinfo is unavailable."""
+    if not ZONEINFO_AVAILABLE:
+        return None
+    return ZoneInfo(tz_name)
+
+
+def _loads_json(data: bytes):
+    """Parse JSON bytes, using orjson when installed."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson only takes BOM-less UTF-8; let the stdlib try other encodings
+            pass
+    return json.loads(data)
+
+
+# Parsed clinic config per path, tagged with the (mtime_ns, size) it was read at
+_CLINIC_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+
 def load_clinic_config(config_path: str = "clinic_config.json") -> dict:
-    """Load clinic configuration from JSON file."""
+    """
+    Load clinic configuration from JSON file.
+    
+    The parsed dict is cached and shared between callers until the file's
+    mtime or size changes, so treat it as read-only.
+    """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        stat = os.stat(config_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _CLINIC_CONFIG_CACHE.get(config_path)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        with open(config_path, 'rb') as f:
+            clinic_config = _loads_json(f.read())
+        # Only the latest version is kept, so stale parses are released
+        _CLINIC_CONFIG_CACHE[config_path] = (version, clinic_config)
+        return clinic_config
     except FileNotFoundError:
         raise FileNotFoundError(f"Clinic configuration file not found: {config_path}")
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON in clinic configuration: {e}")
 
 
-def get_current_time(timezone_name: Optional[str] = None) -> str:
-    """Get current formatted time for the specified timezone."""
-    try:
-        tz_name = timezone_name or PromptConfig.TIMEZONE
-
-        if ZONEINFO_AVAILABLE:
-            try:
-                tz = ZoneInfo(tz_name)
-                current_time = datetime.now(tz)
-                return current_time.strftime("%A, %B %d, %Y at %I:%M %p %Z")
-            except Exception:
-                tz = ZoneInfo("UTC")
-                current_time = datetime.now(tz)
-                return current_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
-        else:
-            from datetime import timezone as dt_timezone
-            current_time = datetime.now(dt_timezone.utc)
-            return current_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
+@lru_cache(maxsize=16)
+def _tz_suffix(tz_name: str, utc_offset: timedelta) -> str:
+    """Zone abbreviation (e.g. IST); keyed on the UTC offset so DST changes are picked up."""
+    tz = get_zoneinfo(tz_name)
+    return tz.tzname(datetime.now(tz))
+
 
+@lru_cache(maxsize=4)
+def _format_current_time(tz_name: str, minute: int) -> str:
+    if not ZONEINFO_AVAILABLE:
+        current_time = datetime.now(dt_timezone.utc)
+        return current_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
+
+    # Only an unknown zone name can fail here; fall back to UTC
+    try:
+        tz = get_zoneinfo(tz_name)
     except Exception:
-        current_time = datetime.now()
-        return f"{current_time.strftime('%A, %B %d, %Y at %I:%M %p')} (Local Time)"
+        current_time = datetime.now(dt_timezone.utc)
+        return current_time.strftime("%A, %B %d, %Y at %I:%M %p UTC")
+
+    current_time = datetime.now(tz)
+    return f"{current_time:%A, %B %d, %Y at %I:%M %p} {_tz_suffix(tz_name, current_time.utcoffset())}"
+
+
+def get_current_time(timezone_name: Optional[str] = None) -> str:
+    """
+    Get current formatted time for the specified timezone.
+    The string has minute resolution, so it is formatted once per minute.
+    """
+    tz_name = timezone_name or PromptConfig.TIMEZONE
+    return _format_current_time(tz_name, int(time.time() // 60))
@@ -9,172 +9,249 @@ from contextvars import ContextVar
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 import logging
+import time
+
+from ..config.settings import PROMPT_CONFIG
 
 logger = logging.getLogger(__name__)
 
-# Context variable to store conversation memory
-_conversation_memo: ContextVar[Optional[Dict[str, Any]]] = ContextVar('conversation_memo', default=None)
+# Context variable to store conversation memory (one memo per session task tree)
+_conversation_memo: ContextVar[Optional["ConversationMemo"]] = ContextVar('conversation_memo', default=None)
+
+
+def _prefetch_bookings(email: str) -> None:
+    """Warm the Cal.com lookups for this patient in the background (best effort)."""
+    try:
+        # Imported lazily: the Cal.com service validates its env on import
+        from ..services.calcom import prefetch_patient_bookings
+        prefetch_patient_bookings(email)
+    except Exception as e:
+        logger.debug("Memo: Bookings prefetch skipped: %s", e)
 
 
 class ConversationMemo:
     """Simple conversation memory to avoid asking same questions twice."""
     
+    # Fixed field set: slots avoid a per-instance dict and make field access an offset load
+    FIELDS = (
+        'patient_email',
+        'patient_name',
+        'patient_phone',
+        'preferred_doctor',
+        'appointment_reason',
+        'appointments',
+        'current_appointment',
+        'action',
+        'session_start',
+        'user_statements'
+    )
+    __slots__ = FIELDS + ('_prompt_context',)
+    # Tool argument name -> memo field, for fill_missing()
+    _FILL_SOURCES = {
+        'patient_email': 'patient_email',
+        'patient_name': 'patient_name',
+        'phone': 'patient_phone',
+        'doctor': 'preferred_doctor',
+        'reason': 'appointment_reason',
+    }
+
     def __init__(self):
         """Initialize empty memo."""
-        self.data: Dict[str, Any] = {
-            'patient_email': None,
-            'patient_name': None,
-            'patient_phone': None,
-            'preferred_doctor': None,
-            'appointment_reason': None,
-            'appointments': [],
-            'current_appointment': None,
-            'action': None,
-            'session_start': datetime.now().isoformat(),
-            'user_statements': []
-        }
-    
-    def update_patient_email(self, email: str) -> None:
-        """Store patient email to avoid asking twice."""
+        self.patient_email: Optional[str] = None
+        self.patient_name: Optional[str] = None
+        self.patient_phone: Optional[str] = None
+        self.preferred_doctor: Optional[str] = None
+        self.appointment_reason: Optional[str] = None
+        self.appointments: List[Dict[str, Any]] = []
+        self.current_appointment: Optional[Dict[str, Any]] = None
+        self.action: Optional[str] = None
+        self.session_start: str = datetime.now().isoformat()
+        self.user_statements: List[Dict[str, Any]] = []
+        # Rendered prompt context; reset by any setter that changes it
+        self._prompt_context: Optional[str] = None
+    
+    def update_patient_email(self, email: str, prefetch: bool = False) -> None:
+        """Store patient email to avoid asking twice.
+        Lookup paths pass prefetch=True to warm the patient's Cal.com bookings."""
         if email:
-            self.data['patient_email'] = email
-            logger.debug(f"Memo: Stored patient email")
+            is_new = email != self.patient_email
+            self.patient_email = email
+            self._prompt_context = None
+            logger.debug("Memo: Stored patient email")
+            if prefetch and is_new:
+                _prefetch_bookings(email)
     
     def update_patient_name(self, name: str) -> None:
         """Store patient name."""
         if name:
-            self.data['patient_name'] = name
-            logger.debug(f"Memo: Stored patient name: {name}")
+            self.patient_name = name
+            self._prompt_context = None
+            logger.debug("Memo: Stored patient name: %s", name)
     
     def update_patient_phone(self, phone: str) -> None:
         """Store patient phone."""
         if phone:
-            self.data['patient_phone'] = phone
-            logger.debug(f"Memo: Stored patient phone")
+            self.patient_phone = phone
+            self._prompt_context = None
+            logger.debug("Memo: Stored patient phone")
     
     def set_appointments(self, appointments: List[Dict[str, Any]]) -> None:
         """Store all appointments found for patient."""
         if appointments:
-            self.data['appointments'] = appointments
-            logger.debug(f"Memo: Stored {len(appointments)} appointment(s)")
+            self.appointments = appointments
+            self._prompt_context = None
+            logger.debug("Memo: Stored %d appointment(s)", len(appointments))
     
     def set_current_appointment(self, appointment: Dict[str, Any]) -> None:
         """Store current appointment being discussed."""
         if appointment:
-            self.data['current_appointment'] = appointment
-            logger.debug(f"Memo: Set current appointment")
+            self.current_appointment = appointment
+            self._prompt_context = None
+            logger.debug("Memo: Set current appointment")
     
     def set_action(self, action: str) -> None:
         """Set what user wants to do: 'book', 'reschedule', 'cancel', etc."""
         if action:
-            self.data['action'] = action
-            logger.debug(f"Memo: Set action to {action}")
+            self.action = action
+            self._prompt_context = None
+            logger.debug("Memo: Set action to %s", action)
     
     def add_user_statement(self, statement: str) -> None:
         """Store important user statements for context."""
         if statement:
-            self.data['user_statements'].append({
+            # Epoch seconds; formatted only when the memo is exported
+            self.user_statements.append({
                 'text': statement,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': time.time()
             })
-            logger.debug(f"Memo: Added user statement")
+            logger.debug("Memo: Added user statement")
     
     def set_preferred_doctor(self, doctor: str) -> None:
         """Store preferred doctor for appointment."""
         if doctor:
-            self.data['preferred_doctor'] = doctor
-            logger.debug(f"Memo: Set preferred doctor: {doctor}")
+            self.preferred_doctor = doctor
+            self._prompt_context = None
+            logger.debug("Memo: Set preferred doctor: %s", doctor)
     
     def set_appointment_reason(self, reason: str) -> None:
         """Store appointment reason or service type."""
         if reason:
-            self.data['appointment_reason'] = reason
-            logger.debug(f"Memo: Set appointment reason: {reason}")
+            self.appointment_reason = reason
+            self._prompt_context = None
+            logger.debug("Memo: Set appointment reason: %s", reason)
     
     def needs_appointment_reason(self) -> bool:
         """Check if we still need to ask for appointment reason."""
-        return not self.data.get('appointment_reason')
+        return not self.appointment_reason
     
     def needs_doctor_selection(self) -> bool:
         """Check if we need to ask for doctor preference (only if multiple doctors)."""
         from ..config.prompts import should_ask_for_doctor
         if not should_ask_for_doctor():
             return False  # Single doctor clinic - no selection needed
-        return not self.data.get('preferred_doctor')
+        return not self.preferred_doctor
     
     def get_preferred_doctor(self) -> Optional[str]:
         """Retrieve stored preferred doctor."""
-        return self.data['preferred_doctor']
+        return self.preferred_doctor
     
     def get_appointment_reason(self) -> Optional[str]:
         """Retrieve stored appointment reason."""
-        return self.data['appointment_reason']
+        return self.appointment_reason
     
     def get_patient_email(self) -> Optional[str]:
         """Retrieve stored patient email."""
-        return self.data['patient_email']
+        return self.patient_email
     
     def get_patient_name(self) -> Optional[str]:
         """Retrieve stored patient name."""
-        return self.data['patient_name']
+        return self.patient_name
     
     def get_patient_phone(self) -> Optional[str]:
         """Retrieve stored patient phone."""
-        return self.data['patient_phone']
+        return self.patient_phone
+    
+    def fill_missing(self, **fields: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        Return the given fields with empty values filled from the memo in one pass.
+        Accepts patient_email, patient_name, phone, doctor and reason; fields the
+        caller already has are returned as is, without touching the memo.
+        """
+        return {
+            name: value or getattr(self, self._FILL_SOURCES[name])
+            for name, value in fields.items()
+        }
     
     def get_appointments(self) -> List[Dict[str, Any]]:
         """Get all stored appointments."""
-        return self.data['appointments']
+        return self.appointments
     
     def get_current_appointment(self) -> Optional[Dict[str, Any]]:
         """Get current appointment being discussed."""
-        return self.data['current_appointment']
+        return self.current_appointment
     
     def get_action(self) -> Optional[str]:
         """Get current action."""
-        return self.data['action']
+        return self.action
     
     def has_email(self) -> bool:
         """Check if we already have patient email."""
-        return self.data['patient_email'] is not None
+        return self.patient_email is not None
     
     def has_appointments(self) -> bool:
         """Check if we already fetched appointments."""
-        return len(self.data['appointments']) > 0
+        return len(self.appointments) > 0
     
     def clear(self) -> None:
         """Clear all memo data (for new conversation or session end)."""
-        self.__init__()
+        self.patient_email = None
+        self.patient_name = None
+        self.patient_phone = None
+        self.preferred_doctor = None
+        self.appointment_reason = None
+        # set_appointments() stores the caller's list, so replace rather than clear it
+        if self.appointments:
+            self.appointments = []
+        self.current_appointment = None
+        self.action = None
+        self.session_start = datetime.now().isoformat()
+        self.user_statements.clear()
+        self._prompt_context = None
         logger.debug("Memo: Cleared all data")
     
     def to_dict(self) -> Dict[str, Any]:
         """Get memo as dictionary for logging/debugging."""
-        return self.data.copy()
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data['user_statements'] = [
+            {**entry, 'timestamp': datetime.fromtimestamp(entry['timestamp']).isoformat()}
+            for entry in self.user_statements
+        ]
+        return data
     
     def get_summary(self) -> str:
         """Get human-readable summary of memo content."""
         summary = []
         
-        if self.data['patient_email']:
-            summary.append(f"Email: {self.data['patient_email']}")
+        if self.patient_email:
+            summary.append(f"Email: {self.patient_email}")
         
-        if self.data['patient_name']:
-            summary.append(f"Name: {self.data['patient_name']}")
+        if self.patient_name:
+            summary.append(f"Name: {self.patient_name}")
         
-        if self.data['patient_phone']:
-            summary.append(f"Phone: {self.data['patient_phone']}")
+        if self.patient_phone:
+            summary.append(f"Phone: {self.patient_phone}")
         
-        if self.data['preferred_doctor']:
-            summary.append(f"Doctor: {self.data['preferred_doctor']}")
+        if self.preferred_doctor:
+            summary.append(f"Doctor: {self.preferred_doctor}")
         
-        if self.data['appointment_reason']:
-            summary.append(f"Reason: {self.data['appointment_reason']}")
+        if self.appointment_reason:
+            summary.append(f"Reason: {self.appointment_reason}")
         
-        if self.data['appointments']:
-            summary.append(f"Appointments: {len(self.data['appointments'])}")
+        if self.appointments:
+            summary.append(f"Appointments: {len(self.appointments)}")
         
-        if self.data['action']:
-            summary.append(f"Action: {self.data['action']}")
+        if self.action:
+            summary.append(f"Action: {self.action}")
         
         return " | ".join(summary) if summary else "Empty memo"
 
@@ -198,66 +275,75 @@ def initialize_memo() -> ConversationMemo:
 
 def clear_memo() -> None:
     """Clear memo (for session end or reset)."""
-    global _conversation_memo
     _conversation_memo.set(None)
     logger.info("Memo cleared - conversation context reset")
 
 
-def get_memo_context_for_prompt() -> str:
+# Memo prompt lines in display order; each is shown when its value is truthy
+_MEMO_CONTEXT_HEADER = "IMPORTANT - Information Already Collected (DO NOT ask for these again):"
+_MEMO_CONTEXT_TEMPLATES = (
+    "✓ Patient's email: {} (DON'T ask again)",
+    "✓ Patient's name: {} (DON'T ask again)",
+    "✓ Patient's phone: {} (DON'T ask again)",
+    "✓ Appointment reason: {} (DON'T ask again)",
+    "✓ Preferred doctor: {} (DON'T ask again)",
+    "✓ Found {} existing appointment(s) (already shown to patient)",
+    "✓ Current appointment selected (details stored)",
+    "✓ Current task: {}"
+)
+
+
+# Free-text values (task, doctor, reason) ellipsized in this order when over the cap;
+# the identity lines (email, name, phone) are always kept whole
+_MEMO_SHORTENABLE = (7, 4, 3)
+
+
+def _join_memo_context(values: List[Any]) -> str:
+    """Join the header and one line per truthy value."""
+    parts = [template.format(value) for template, value in zip(_MEMO_CONTEXT_TEMPLATES, values) if value]
+    if not parts:
+        return ""
+    return f"{_MEMO_CONTEXT_HEADER}\n" + "\n".join(parts)
+
+
+def _render_memo_context(values: List[Any], max_chars: int) -> str:
+    """Render the memo block for a list of field values (one per template),
+    shortening the free-text values until it fits in max_chars."""
+    context = _join_memo_context(values)
+    for index in _MEMO_SHORTENABLE:
+        overflow = len(context) - max_chars
+        if overflow <= 0:
+            break
+        value = values[index]
+        if not value:
+            continue
+        values[index] = value[:max(len(value) - overflow - 1, 0)] + "…"
+        context = _join_memo_context(values)
+    return context
+
+
+def get_memo_context_for_prompt(memo: Optional[ConversationMemo] = None) -> str:
     """
     Generate string for injection into system prompt to remind agent 
     of remembered information. This helps agent avoid asking duplicate questions.
+    The string is reused until the memo changes, so the prompt build and
+    every tool response in a turn share one rendering.
+    Callers already holding the memo can pass it to skip the context lookup.
     """
-    memo = get_memo()
-    
-    context_parts = []
-    
-    # Patient contact information
-    if memo.has_email():
-        context_parts.append(
-            f"✓ Patient's email: {memo.get_patient_email()} (DON'T ask again)"
-        )
-    
-    if memo.get_patient_name():
-        context_parts.append(
-            f"✓ Patient's name: {memo.get_patient_name()} (DON'T ask again)"
-        )
-    
-    if memo.get_patient_phone():
-        context_parts.append(
-            f"✓ Patient's phone: {memo.get_patient_phone()} (DON'T ask again)"
-        )
-    
-    # Appointment preferences
-    if memo.get_appointment_reason():
-        context_parts.append(
-            f"✓ Appointment reason: {memo.get_appointment_reason()} (DON'T ask again)"
-        )
-    
-    if memo.get_preferred_doctor():
-        context_parts.append(
-            f"✓ Preferred doctor: {memo.get_preferred_doctor()} (DON'T ask again)"
-        )
-    
-    # Appointment status
-    if memo.has_appointments():
-        apts = memo.get_appointments()
-        context_parts.append(
-            f"✓ Found {len(apts)} existing appointment(s) (already shown to patient)"
-        )
-    
-    if memo.get_current_appointment():
-        context_parts.append(
-            f"✓ Current appointment selected (details stored)"
-        )
-    
-    if memo.get_action():
-        context_parts.append(
-            f"✓ Current task: {memo.get_action()}"
+    if memo is None:
+        memo = get_memo()
+    if memo._prompt_context is None:
+        memo._prompt_context = _render_memo_context(
+            [
+                memo.patient_email,
+                memo.patient_name,
+                memo.patient_phone,
+                memo.appointment_reason,
+                memo.preferred_doctor,
+                len(memo.appointments),
+                bool(memo.current_appointment),
+                memo.action
+            ],
+            PROMPT_CONFIG.MEMO_MAX_CHARS
         )
-    
-    if context_parts:
-        header = "IMPORTANT - Information Already Collected (DO NOT ask for these again):"
-        return f"{header}\n" + "\n".join(context_parts)
-    
-    return ""
+    return memo._prompt_context
@@ -2,21 +2,16 @@
 Services package - Core business logic services
 """
 
-from .database import DatabaseService
-
-# Singleton getter function
-def get_db() -> DatabaseService:
-    """Get or create the database service singleton."""
-    try:
-        from .database import _db as _db_instance
-        if _db_instance is None:
-            return DatabaseService()
-        return _db_instance
-    except:
-        return DatabaseService()
+from .database import DatabaseService, get_db
+from .plugins import get_stt, get_vad, get_llm, get_tts, get_noise_cancellation
 
 __all__ = [
     'DatabaseService',
-    'get_db'
+    'get_db',
+    'get_stt',
+    'get_vad',
+    'get_llm',
+    'get_tts',
+    'get_noise_cancellation'
 ]
 
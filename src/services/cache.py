@@ -0,0 +1,171 @@
+"""
+Shared Cache Module
+
+Optional Redis-backed JSON cache shared by every worker process.
+Enabled when REDIS_URL is set and the redis package is installed; otherwise
+every call is a cheap no-op (get returns None) and callers rely on their
+in-process caches. Cache failures are logged and treated as misses, so
+Redis being slow or down never breaks a lookup.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from ..config.settings import REDIS_CONFIG
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Prefix for every key this service writes
+KEY_PREFIX = "dental-agent:"
+
+# Seconds to stop calling Redis after a failure, so an outage costs one timeout
+_FAILURE_BACKOFF = 30.0
+
+_client = None
+_client_lock = threading.Lock()
+_down_until = 0.0
+
+
+def _get_client() -> Optional[Any]:
+    """
+    Shared Redis client (it pools connections internally), or None when
+    disabled or backing off after a failure.
+    """
+    global _client
+    if time.monotonic() < _down_until:
+        return None
+    if _client is None and REDIS_AVAILABLE and REDIS_CONFIG["url"]:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    REDIS_CONFIG["url"],
+                    socket_timeout=REDIS_CONFIG["socket_timeout"],
+                    socket_connect_timeout=REDIS_CONFIG["socket_connect_timeout"]
+                )
+                logger.info("Shared Redis cache enabled")
+    return _client
+
+
+def _failed(action: str, key: str, error: Exception) -> None:
+    """Log a cache failure and skip Redis for a while."""
+    global _down_until
+    _down_until = time.monotonic() + _FAILURE_BACKOFF
+    logger.warning("Shared cache %s failed for %s (pausing %.0fs): %s", action, key, _FAILURE_BACKOFF, error)
+
+
+def is_enabled() -> bool:
+    """True when a shared cache is configured."""
+    return _get_client() is not None
+
+
+def get_json(key: str) -> Optional[Any]:
+    """Cached value for key, or None on a miss / when disabled."""
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        raw = client.get(KEY_PREFIX + key)
+        return json.loads(raw) if raw is not None else None
+    except Exception as e:
+        _failed("get", key, e)
+        return None
+
+
+def set_json(key: str, value: Any, ex: int) -> None:
+    """Store value under key for ex seconds."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.set(KEY_PREFIX + key, json.dumps(value), ex=ex)
+    except Exception as e:
+        _failed("set", key, e)
+
+
+# Deletes a hold only while it still belongs to the caller
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+def try_hold(key: str, owner: str, ttl: int) -> bool:
+    """
+    Claim key for owner for ttl seconds (SET NX EX). True if the claim is
+    new or already owner's; also True when disabled or failing, so a cache
+    outage never blocks the caller.
+    """
+    client = _get_client()
+    if client is None:
+        return True
+    try:
+        full_key = KEY_PREFIX + key
+        if client.set(full_key, owner, nx=True, ex=ttl):
+            return True
+        return client.get(full_key) == owner.encode()
+    except Exception as e:
+        _failed("hold", key, e)
+        return True
+
+
+def release_hold(key: str, owner: str) -> None:
+    """Release owner's claim on key (someone else's claim is left alone)."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.eval(_RELEASE_SCRIPT, 1, KEY_PREFIX + key, owner)
+    except Exception as e:
+        _failed("release", key, e)
+
+
+def get_generation(name: str) -> Optional[int]:
+    """
+    Current generation counter for a key namespace, or None when it can't be
+    read (callers must then skip the cache rather than risk stale keys).
+    Embedding it in keys lets bump_generation() invalidate every key in the
+    namespace at once.
+    """
+    client = _get_client()
+    if client is None:
+        return None
+    try:
+        return int(client.get(KEY_PREFIX + "gen:" + name) or 0)
+    except Exception as e:
+        _failed("generation read", name, e)
+        return None
+
+
+def bump_generation(name: str) -> None:
+    """Invalidate every key built with the namespace's current generation."""
+    client = _get_client()
+    if client is None:
+        return
+    try:
+        client.incr(KEY_PREFIX + "gen:" + name)
+    except Exception as e:
+        _failed("generation bump", name, e)
+
+
+# ----------------------------
+# SESSION STATE
+# ----------------------------
+
+# Seconds a session's last booking survives, so a reconnecting caller keeps it
+LAST_BOOKING_TTL = 900
+
+
+def set_last_booking(session_id: str, booking: dict) -> None:
+    """Remember a session's most recent booking for quick cancel/reschedule."""
+    set_json(f"session:last_booking:{session_id}", booking, ex=LAST_BOOKING_TTL)
+
+
+def get_last_booking(session_id: str) -> Optional[dict]:
+    """A session's most recent booking, or None if unknown or expired."""
+    return get_json(f"session:last_booking:{session_id}")
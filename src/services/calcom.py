@@ -2,16 +2,35 @@
 Cal.com v2 Service – Hybrid Working Version
 - Uses v2 API for user info and schedule data
 - Generates availability slots from schedule working hours  
+  (or, with CALCOM_SLOTS_API=true, asks the v2 slots endpoint)
 - Uses v2 API for booking appointments
 """
 
 import os
+import json
+import random
+import re
+import time
+import threading
 import requests
 import logging
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
 from zoneinfo import ZoneInfo
-from typing import Dict, Any, List, Optional
+from typing import AbstractSet, Dict, Any, FrozenSet, List, Optional, Tuple
+
+from . import cache as shared_cache
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 # ----------------------------
 # ENV + LOGGING
@@ -36,6 +55,80 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 
+# Headers for the versioned bookings endpoints
+HEADERS_V2 = {**HEADERS, "cal-api-version": "2024-08-13"}
+
+# Headers for the versioned slots endpoint
+HEADERS_SLOTS = {**HEADERS, "cal-api-version": "2024-09-04"}
+
+# Ask Cal.com's /slots endpoint for bookable times instead of building them
+# from the schedule and bookings (falls back to that if the call fails)
+CALCOM_SLOTS_API = os.getenv("CALCOM_SLOTS_API", "false").lower() == "true"
+
+# Seconds before a Cal.com request is abandoned
+CALCOM_TIMEOUT = float(os.getenv("CALCOM_TIMEOUT", "10"))
+
+# Shared session so TCP/TLS connections to Cal.com are kept alive and reused
+# (book/cancel POSTs included). The adapter only retries failed connects,
+# where the request never reached Cal.com, so it's safe for POSTs too.
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=int(os.getenv("CALCOM_POOL_SIZE", "10")),
+    max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.2)
+))
+
+# Runs independent Cal.com requests side by side
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="calcom")
+
+# Retries for idempotent GETs on rate limiting / transient server errors
+CALCOM_RETRIES = int(os.getenv("CALCOM_RETRIES", "2"))
+CALCOM_RETRY_BACKOFF = float(os.getenv("CALCOM_RETRY_BACKOFF", "0.25"))
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Upper bound on a single wait, so a large Retry-After can't stall the call
+_MAX_RETRY_WAIT = 2.0
+
+# Client-side cap on Cal.com requests per worker process (Cal.com allows
+# 120/min per API key), so bursts queue briefly instead of drawing 429s
+CALCOM_RATE_LIMIT = float(os.getenv("CALCOM_RATE_LIMIT", "2"))   # requests/second, 0 = off
+CALCOM_RATE_BURST = int(os.getenv("CALCOM_RATE_BURST", "10"))
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: up to `burst` requests at once, refilled at
+    `rate` per second. acquire() reserves a token and sleeps until it's due,
+    so waiting callers are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self._rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            logger.info("[CALCOM] Rate limit reached, waiting %.2fs", wait)
+            time.sleep(wait)
+
+
+_rate_limiter = RateLimiter(CALCOM_RATE_LIMIT, CALCOM_RATE_BURST)
+
+_UTC = ZoneInfo("UTC")
+
+# ZoneInfo construction per call still costs a cache lookup; memoize by name
+_get_tz = lru_cache(maxsize=32)(ZoneInfo)
+
 # ----------------------------
 # HELPERS
 # ----------------------------
@@ -48,10 +141,33 @@ def _ensure_iso_utc(dt: str) -> str:
     parsed = datetime.fromisoformat(dt.replace("Z", "+00:00"))
     if parsed.tzinfo is None:
         # Naive datetime - assume UTC
-        from zoneinfo import ZoneInfo
-        parsed = parsed.replace(tzinfo=ZoneInfo("UTC"))
+        parsed = parsed.replace(tzinfo=_UTC)
     return parsed.isoformat()
 
+def _get_with_retry(url: str, **kwargs) -> requests.Response:
+    """
+    GET through the shared session, retrying 429/5xx responses with
+    exponential backoff plus jitter (honors Retry-After). Failed connects are
+    already retried by the session adapter. Returns the last response.
+    """
+    for attempt in range(CALCOM_RETRIES + 1):
+        _rate_limiter.acquire()
+        response = _http.get(url, timeout=CALCOM_TIMEOUT, **kwargs)
+        if response.status_code not in _RETRY_STATUSES or attempt == CALCOM_RETRIES:
+            return response
+
+        wait = CALCOM_RETRY_BACKOFF * 2 ** attempt + random.random() * 0.1
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                pass
+        wait = min(wait, _MAX_RETRY_WAIT)
+        logger.warning(f"[CALCOM] GET {url} failed ({response.status_code}), retry {attempt + 1}/{CALCOM_RETRIES} in {wait:.2f}s")
+        time.sleep(wait)
+
+
 def _get_standard_date_range(days_ahead: int = 90) -> tuple:
     """
     Generate standard date range for CalCom API filtering.
@@ -66,28 +182,130 @@ def _get_standard_date_range(days_ahead: int = 90) -> tuple:
         # afterStart = "2026-02-07T00:00:00+00:00"
         # beforeEnd = "2026-05-08T23:59:59+00:00"
     """
+    today, end_date = _get_standard_date_range_dt(days_ahead)
+    return today.isoformat(), end_date.isoformat()
+
+
+def _get_standard_date_range_dt(days_ahead: int = 90) -> Tuple[datetime, datetime]:
+    """Same range as _get_standard_date_range, as aware datetimes (no ISO round-trip)."""
+    return _standard_range_dt(days_ahead, datetime.now(_UTC).toordinal())
+
+
+@lru_cache(maxsize=8)
+def _standard_range_dt(days_ahead: int, today_ordinal: int) -> Tuple[datetime, datetime]:
+    """
+    Standard range as aware datetimes: (today 00:00:00Z, today + days_ahead 23:59:59Z).
+    Keyed by the UTC date's ordinal, so it is computed once per day.
+    """
     # Today at 00:00:00 UTC
-    today = datetime.now(ZoneInfo("UTC")).replace(hour=0, minute=0, second=0, microsecond=0)
+    today = datetime.fromordinal(today_ordinal).replace(tzinfo=_UTC)
     
-    # 90 days from today at 23:59:59 UTC
-    end_date = today + timedelta(days=days_ahead)
-    end_date = end_date.replace(hour=23, minute=59, second=59, microsecond=0)
+    # days_ahead from today at 23:59:59 UTC
+    end_date = (today + timedelta(days=days_ahead)).replace(hour=23, minute=59, second=59)
     
-    return today.isoformat(), end_date.isoformat()
+    return today, end_date
 
 # ----------------------------
 # GET SCHEDULE INFO
 # ----------------------------
 
+# Working hours change rarely; reuse the fetched schedule for this many seconds
+SCHEDULE_CACHE_TTL = float(os.getenv("CALCOM_SCHEDULE_CACHE_TTL", "300"))
+
+# (fetched_at monotonic seconds, schedule)
+_schedule_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_schedule_lock = threading.Lock()
+
+
+def invalidate_schedule_cache() -> None:
+    """Force the next get_first_schedule() call to refetch from Cal.com."""
+    global _schedule_cache
+    with _schedule_lock:
+        _schedule_cache = None
+    _generate_slot_grid.cache_clear()
+
+
 def get_first_schedule() -> Dict[str, Any]:
-    url = f"{CALCOM_BASE_URL}/schedules"
-    # Note: schedules endpoint works without the cal-api-version header
-    response = requests.get(url, headers=HEADERS)
-    response.raise_for_status()
-    data = response.json().get("data", [])
-    if not data:
-        raise RuntimeError("No schedules found for this account.")
-    return data[0]
+    """
+    Fetch the account's first schedule, cached for SCHEDULE_CACHE_TTL seconds.
+    The returned dict is shared between callers, so treat it as read-only.
+    """
+    global _schedule_cache
+    with _schedule_lock:
+        if _schedule_cache and time.monotonic() - _schedule_cache[0] < SCHEDULE_CACHE_TTL:
+            return _schedule_cache[1]
+
+        url = f"{CALCOM_BASE_URL}/schedules"
+        # Note: schedules endpoint works without the cal-api-version header
+        response = _get_with_retry(url, headers=HEADERS)
+        response.raise_for_status()
+        data = _loads(response.content).get("data", [])
+        if not data:
+            raise RuntimeError("No schedules found for this account.")
+
+        _schedule_cache = (time.monotonic(), data[0])
+        return data[0]
+
+@lru_cache(maxsize=32)
+def _iso_offset_suffix(offset: timedelta) -> str:
+    """ISO-8601 UTC offset suffix ("+05:30") for a utcoffset() value."""
+    return datetime(2000, 1, 1, tzinfo=timezone(offset)).isoformat()[19:]
+
+
+@lru_cache(maxsize=64)
+def _generate_slot_grid(
+    work_days: FrozenSet[int],
+    start_minutes: int,
+    end_minutes: int,
+    start_day: date,
+    end_dt_tz: datetime,
+    duration_minutes: int,
+    timezone_name: str
+) -> Tuple[Tuple[str, Tuple[Tuple[int, str], ...]], ...]:
+    """
+    Every working-hours slot between start_day and end_dt_tz, as
+    ((date_key, ((slot_epoch, slot_iso), ...)), ...) with slot_epoch in
+    integer UTC seconds.
+    Pure function of the working hours and range, so it is cached; callers
+    filter out slots that are already in the past.
+    """
+    tz = _get_tz(timezone_name)
+
+    # Slot start offsets are the same for every working day, so compute the
+    # deltas and "HH:MM:SS" strings once instead of per day
+    slot_minutes = range(start_minutes, end_minutes - duration_minutes + 1, duration_minutes)
+    slot_offsets = [timedelta(minutes=m) for m in slot_minutes]
+    slot_times = [f"{m // 60:02d}:{m % 60:02d}:00" for m in slot_minutes]
+
+    grid = []
+    current_dt_tz = datetime(start_day.year, start_day.month, start_day.day, tzinfo=tz)
+
+    while current_dt_tz <= end_dt_tz:
+        # Check if this day is a working day (1=Monday, 7=Sunday)
+        if slot_offsets and current_dt_tz.isoweekday() in work_days:
+            date_key = current_dt_tz.strftime("%Y-%m-%d")
+            # Aware + timedelta is wall-clock arithmetic, same as replace(hour=..., minute=...)
+            starts = [current_dt_tz + offset for offset in slot_offsets]
+
+            first_offset = starts[0].utcoffset()
+            if starts[-1].utcoffset() == first_offset:
+                # One UTC offset all day: build ISO strings by concatenation
+                suffix = _iso_offset_suffix(first_offset)
+                isos = [f"{date_key}T{t}{suffix}" for t in slot_times]
+            else:
+                # DST change inside working hours: suffix per slot
+                isos = [
+                    f"{date_key}T{t}{_iso_offset_suffix(slot_start.utcoffset())}"
+                    for slot_start, t in zip(starts, slot_times)
+                ]
+
+            epochs = [int(slot_start.timestamp()) for slot_start in starts]
+            grid.append((date_key, tuple(zip(epochs, isos))))
+                
+        current_dt_tz += timedelta(days=1)
+
+    return tuple(grid)
+
 
 def generate_slots_from_schedule(
     schedule: Dict[str, Any], 
@@ -97,75 +315,70 @@ def generate_slots_from_schedule(
     timezone_name: str
 ) -> Dict[str, List[Dict[str, str]]]:
     """Generate available slots from schedule data"""
-    
-    slots_by_date = {}
+    return {
+        date_key: [{"start": slot_iso} for _, slot_iso in day_slots]
+        for date_key, day_slots in _bookable_slots(schedule, start_dt, end_dt, duration_minutes, timezone_name)
+    }
+
+
+def _bookable_slots(
+    schedule: Dict[str, Any],
+    start_dt: datetime,
+    end_dt: datetime,
+    duration_minutes: int,
+    timezone_name: str
+) -> List[Tuple[str, Tuple[Tuple[int, str], ...]]]:
+    """
+    Not-yet-past working-hours slots as [(date_key, ((slot_epoch, slot_iso), ...)), ...].
+    Days without bookable slots are left out.
+    """
+    slots_by_date = []
     
     # Get working hours from schedule
     working_hours = schedule.get("workingHours", [])
     if not working_hours:
         logger.warning("No working hours found in schedule")
-        return {}
+        return []
         
     # For simplicity, use the first working hours entry
     work_hours = working_hours[0]
-    work_days = work_hours["days"]  # [1,2,3,4,5] for Mon-Fri
+    work_days = frozenset(work_hours["days"])  # {1,2,3,4,5} for Mon-Fri
     start_minutes = work_hours["startTime"]  # Minutes from midnight
     end_minutes = work_hours["endTime"]    # Minutes from midnight
     
-    # Convert minutes to hours
-    work_start_hour = start_minutes // 60
-    work_start_min = start_minutes % 60
-    work_end_hour = end_minutes // 60
-    work_end_min = end_minutes % 60
-    
-    logger.info(f"Working hours: {work_start_hour:02d}:{work_start_min:02d} - {work_end_hour:02d}:{work_end_min:02d} on days {work_days}")
-    
-    # Generate slots for each day in the range
-    current_dt = start_dt.replace(hour=0, minute=0, second=0, microsecond=0)
-    tz = ZoneInfo(timezone_name)
+    logger.info(f"Working hours: {start_minutes // 60:02d}:{start_minutes % 60:02d} - {end_minutes // 60:02d}:{end_minutes % 60:02d} on days {work_hours['days']}")
     
     # Convert start and end to target timezone for proper day iteration
+    tz = _get_tz(timezone_name)
     start_dt_tz = start_dt.astimezone(tz)
     end_dt_tz = end_dt.astimezone(tz)
     
-    # Get current time in the target timezone to filter past slots
-    now_utc = datetime.now(ZoneInfo("UTC"))
-    now_tz = now_utc.astimezone(tz)
+    # Filter past slots against the current time (epoch seconds)
     # Add buffer of 10 minutes to ensure slot is bookable
-    min_booking_time = now_tz + timedelta(minutes=10)
-    
-    # Start iteration from the start date in target timezone
-    current_dt_tz = start_dt_tz.replace(hour=0, minute=0, second=0, microsecond=0)
-    
-    while current_dt_tz <= end_dt_tz:
-        # Check if this day is a working day (1=Monday, 7=Sunday)
-        weekday = current_dt_tz.isoweekday()  # 1-7
-        
-        if weekday in work_days:
-            date_key = current_dt_tz.strftime("%Y-%m-%d")
-            day_slots = []
-            
-            # Generate slots for this day in the target timezone
-            slot_start = current_dt_tz.replace(hour=work_start_hour, minute=work_start_min)
-            work_end = current_dt_tz.replace(hour=work_end_hour, minute=work_end_min)
-            
-            while slot_start + timedelta(minutes=duration_minutes) <= work_end:
-                # slot_start is already in target timezone
-                # Only include slots that are in the future (with 10-minute buffer)
-                if slot_start >= min_booking_time:
-                    slot_iso = slot_start.isoformat()
-                    day_slots.append({
-                        "start": slot_iso
-                    })
-                
-                # Move to next slot
-                slot_start += timedelta(minutes=duration_minutes)
-            
-            # Only add date if it has available slots
-            if day_slots:
-                slots_by_date[date_key] = day_slots
-                
-        current_dt_tz += timedelta(days=1)
+    min_booking_time = time.time() + 600
+    
+    grid = _generate_slot_grid(
+        work_days,
+        start_minutes,
+        end_minutes,
+        start_dt_tz.date(),
+        end_dt_tz,
+        duration_minutes,
+        timezone_name
+    )
+
+    for date_key, day_grid in grid:
+        if day_grid[-1][0] < min_booking_time:
+            # Whole day already past
+            continue
+        if day_grid[0][0] >= min_booking_time:
+            # Whole day bookable; only the boundary day needs per-slot checks
+            day_slots = day_grid
+        else:
+            day_slots = tuple(slot for slot in day_grid if slot[0] >= min_booking_time)
+        # Only add date if it has available slots
+        if day_slots:
+            slots_by_date.append((date_key, day_slots))
     
     logger.info(f"Generated slots for {len(slots_by_date)} days")
     return slots_by_date
@@ -209,20 +422,17 @@ def get_bookings(start_date: datetime, end_date: datetime, status: str = "upcomi
             "status": status                      # ✓ MANDATORY (default: upcoming)
         }
         
-        headers = HEADERS.copy()
-        headers["cal-api-version"] = "2024-08-13"
-        
         # Log the API call with all mandatory filters
-        logger.info(f"[GET_BOOKINGS] ✓ Fetching {status} bookings with mandatory filters:")
-        logger.info(f"  - eventTypeId={CALCOM_EVENT_TYPE_ID}")
-        logger.info(f"  - afterStart={start_str}")
-        logger.info(f"  - beforeEnd={end_str}")
-        logger.info(f"  - status={status}")
+        logger.info(
+            "[GET_BOOKINGS] ✓ Fetching %s bookings with mandatory filters: "
+            "eventTypeId=%s afterStart=%s beforeEnd=%s status=%s",
+            status, CALCOM_EVENT_TYPE_ID, start_str, end_str, status
+        )
         
-        response = requests.get(url, headers=headers, params=params)
+        response = _get_with_retry(url, headers=HEADERS_V2, params=params)
         
         if response.ok:
-            data = response.json()
+            data = _loads(response.content)
             
             # Extract bookings from response
             if isinstance(data, list):
@@ -243,7 +453,167 @@ def get_bookings(start_date: datetime, end_date: datetime, status: str = "upcomi
         logger.error(f"Error fetching bookings: {e}", exc_info=True)
         return []
 
+class BookingsFetcher:
+    """
+    Coalesces concurrent bookings-by-email lookups.
+    Callers asking for the same (email, range, status) while a request is in
+    flight share its Future; distinct lookups run side by side on the shared
+    executor and connection pool. Cal.com takes one attendeeEmail per call,
+    so _dispatch is the single place to change if a multi-email endpoint appears.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor):
+        self._executor = executor
+        self._pending: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, attendee_email: str, start_date: datetime, end_date: datetime, status: str) -> Future:
+        """Future for the lookup, joining an identical in-flight one if present."""
+        key = (attendee_email.lower(), start_date.isoformat(), end_date.isoformat(), status)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                logger.info(f"[GET_BOOKINGS_BY_EMAIL] Joining in-flight lookup for {attendee_email}")
+                return future
+            future = self._dispatch(attendee_email, start_date, end_date, status)
+            self._pending[key] = future
+        future.add_done_callback(lambda _f: self._forget(key))
+        return future
+
+    def _dispatch(self, attendee_email: str, start_date: datetime, end_date: datetime, status: str) -> Future:
+        return self._executor.submit(_fetch_bookings_by_email, attendee_email, start_date, end_date, status)
+
+    def _forget(self, key: tuple) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+
+
+_bookings_fetcher = BookingsFetcher(_executor)
+
+# Seconds a prefetched bookings-by-email result stays usable
+BOOKINGS_PREFETCH_TTL = 30
+
+# In-flight or finished prefetches: {(email, afterStart, beforeEnd, status): (started_at, future)}
+_bookings_prefetch: Dict[tuple, Tuple[float, Future]] = {}
+_prefetch_lock = threading.Lock()
+
+# Seconds a fetched bookings-by-email result is reused by follow-up lookups
+BOOKINGS_CACHE_TTL = float(os.getenv("CALCOM_BOOKINGS_CACHE_TTL", "30"))
+
+# Recent non-empty results, same key as the prefetch: {key: (fetched_at, bookings)}
+_bookings_cache: Dict[tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+# Bumped by every invalidation so a fetch that straddles one isn't cached
+_bookings_generation = 0
+
+# Seconds a found booking is shared across workers for the same patient lookup
+BOOKING_LOOKUP_CACHE_TTL = int(os.getenv("CALCOM_BOOKING_CACHE_TTL", "60"))
+
+# Seconds a computed availability result is reused for the same query
+AVAILABILITY_CACHE_TTL = float(os.getenv("CALCOM_AVAILABILITY_CACHE_TTL", "30"))
+
+# {(start, end, timezone_name, duration_minutes): (computed_at, result)}
+_availability_cache: Dict[tuple, Tuple[float, Dict[str, Any]]] = {}
+# Lookups being computed, joined by identical concurrent queries: {key: future}
+_availability_pending: Dict[tuple, Future] = {}
+
+
+def prefetch_patient_bookings(attendee_email: str) -> None:
+    """
+    Start fetching a patient's active bookings (standard 90-day window) and
+    warm the schedule cache in the background, so the lookup that follows
+    email capture doesn't pay for the round-trips serially.
+    """
+    if not attendee_email:
+        return
+    start_dt, end_dt = _get_standard_date_range_dt(90)
+    status = "upcoming,unconfirmed"
+    key = (attendee_email.lower(), start_dt.isoformat(), end_dt.isoformat(), status)
+
+    with _prefetch_lock:
+        entry = _bookings_prefetch.get(key)
+        if entry and time.monotonic() - entry[0] < BOOKINGS_PREFETCH_TTL:
+            return
+        future = _bookings_fetcher.submit(attendee_email, start_dt, end_dt, status)
+        _bookings_prefetch[key] = (time.monotonic(), future)
+
+    _executor.submit(get_first_schedule)
+    logger.info(f"[PREFETCH] Started bookings prefetch for {attendee_email}")
+
+
+# Expired entries are swept once a cache grows past this many keys
+_CACHE_SWEEP_SIZE = 256
+
+
+def _store_with_ttl(store: Dict[tuple, Tuple[float, Any]], key: tuple, value: Any, ttl: float) -> None:
+    """Store value under key, sweeping expired entries when the store is large (hold _prefetch_lock)."""
+    now = time.monotonic()
+    if len(store) >= _CACHE_SWEEP_SIZE:
+        for stale in [k for k, (stored_at, _) in store.items() if now - stored_at >= ttl]:
+            del store[stale]
+    store[key] = (now, value)
+
+
+def invalidate_bookings_cache(attendee_email: Optional[str] = None) -> None:
+    """
+    Drop prefetched and cached bookings for one attendee, or for everyone
+    when no email is given, plus all cached availability
+    (call after anything that changes bookings).
+    """
+    global _bookings_generation
+    # Any booking change can free or take a slot, in every worker
+    shared_cache.bump_generation("availability")
+    shared_cache.bump_generation("booking_lookup")
+    with _prefetch_lock:
+        _bookings_generation += 1
+        _availability_cache.clear()
+        # Lookups already running may predate the change; later queries start fresh
+        _availability_pending.clear()
+        if attendee_email is None:
+            _bookings_prefetch.clear()
+            _bookings_cache.clear()
+            return
+        email = attendee_email.lower()
+        for store in (_bookings_prefetch, _bookings_cache):
+            for key in [key for key in store if key[0] == email]:
+                del store[key]
+
+
 def get_bookings_by_email(attendee_email: str, start_date: datetime, end_date: datetime, status: str = "upcoming,unconfirmed") -> List[Dict[str, Any]]:
+    """
+    Fetch bookings filtered by attendee email, reusing (in order) a result
+    fetched within BOOKINGS_CACHE_TTL, a matching prefetch started by
+    prefetch_patient_bookings() (each prefetch is used once), or an identical
+    lookup already in flight from another conversation.
+    The returned list may be shared between callers, so treat it as read-only.
+    """
+    if not attendee_email:
+        return _fetch_bookings_by_email(attendee_email, start_date, end_date, status)
+
+    key = (attendee_email.lower(), start_date.isoformat(), end_date.isoformat(), status)
+    now = time.monotonic()
+    with _prefetch_lock:
+        cached = _bookings_cache.get(key)
+        if cached and now - cached[0] < BOOKINGS_CACHE_TTL:
+            logger.info(f"[GET_BOOKINGS_BY_EMAIL] Using cached bookings for {attendee_email}")
+            return cached[1]
+        entry = _bookings_prefetch.pop(key, None)
+        generation = _bookings_generation
+
+    if entry and now - entry[0] < BOOKINGS_PREFETCH_TTL:
+        logger.info(f"[GET_BOOKINGS_BY_EMAIL] Using prefetched bookings for {attendee_email}")
+        bookings = entry[1].result()
+    else:
+        bookings = _bookings_fetcher.submit(attendee_email, start_date, end_date, status).result()
+
+    # Empty results aren't cached: they may be a failed request, not "no bookings"
+    if bookings:
+        with _prefetch_lock:
+            if generation == _bookings_generation:
+                _store_with_ttl(_bookings_cache, key, bookings, BOOKINGS_CACHE_TTL)
+    return bookings
+
+
+def _fetch_bookings_by_email(attendee_email: str, start_date: datetime, end_date: datetime, status: str = "upcoming,unconfirmed") -> List[Dict[str, Any]]:
     """
     Fetch bookings filtered by attendee email using server-side filtering.
     Cal.com filters results by attendeeEmail parameter for optimal performance.
@@ -285,21 +655,17 @@ def get_bookings_by_email(attendee_email: str, start_date: datetime, end_date: d
             "attendeeEmail": attendee_email          # ✓ MANDATORY - server-side filtering
         }
         
-        headers = HEADERS.copy()
-        headers["cal-api-version"] = "2024-08-13"
-        
         # Log the API call with all mandatory filters
-        logger.info(f"[GET_BOOKINGS_BY_EMAIL] ✓ Fetching {status} bookings with mandatory filters:")
-        logger.info(f"  - eventTypeId={CALCOM_EVENT_TYPE_ID}")
-        logger.info(f"  - afterStart={start_str}")
-        logger.info(f"  - beforeEnd={end_str}")
-        logger.info(f"  - status={status}")
-        logger.info(f"  - attendeeEmail={attendee_email} (server-side filter)")
+        logger.info(
+            "[GET_BOOKINGS_BY_EMAIL] ✓ Fetching %s bookings with mandatory filters: "
+            "eventTypeId=%s afterStart=%s beforeEnd=%s status=%s attendeeEmail=%s (server-side filter)",
+            status, CALCOM_EVENT_TYPE_ID, start_str, end_str, status, attendee_email
+        )
         
-        response = requests.get(url, headers=headers, params=params)
+        response = _get_with_retry(url, headers=HEADERS_V2, params=params)
         
         if response.ok:
-            data = response.json()
+            data = _loads(response.content)
             
             # Extract bookings from response
             if isinstance(data, list):
@@ -340,33 +706,43 @@ def _normalize_name(name: str) -> set:
     return set(name.lower().split())
 
 
-def _names_match(user_provided_name: str, stored_name: str) -> bool:
+@lru_cache(maxsize=512)
+def _stored_name_words(stored_name: str) -> FrozenSet[str]:
+    """Normalized words of a booking's attendee name, cached across lookups."""
+    return frozenset(_normalize_name(stored_name))
+
+
+def _names_match(user_words: AbstractSet[str], stored_name: str) -> bool:
     """
     Check if names match using word-based comparison.
     User-provided name words should be a subset of stored name words.
     
     Example:
-        user_provided_name = "Naveen Sharma"
+        user_words = _normalize_name("Naveen Sharma")
         stored_name = "Naveen Kumar Sharma"
         Result: True (both names match)
     
     Args:
-        user_provided_name: Name provided by user (e.g., "Naveen Sharma")
+        user_words: Normalized words of the name provided by user
+                    (hoisted out of the booking loop by the caller)
         stored_name: Name from CalCom booking (e.g., "Naveen Kumar Sharma")
         
     Returns:
         True if names match intelligently, False otherwise
     """
-    if not user_provided_name or not stored_name:
+    if not stored_name:
         return False
     
-    user_words = _normalize_name(user_provided_name)
-    stored_words = _normalize_name(stored_name)
+    stored_words = _stored_name_words(stored_name)
+    
+    # More words than the stored name has can never be a subset
+    if len(user_words) > len(stored_words):
+        return False
     
     # User's words should be a subset of stored words
     # e.g., {"naveen", "sharma"} ⊆ {"naveen", "kumar", "sharma"} = True
-    match = user_words.issubset(stored_words)
-    logger.debug(f"Name matching: user={user_words}, stored={stored_words}, match={match}")
+    match = user_words <= stored_words
+    logger.debug("Name matching: user=%s, stored=%s, match=%s", user_words, stored_words, match)
     return match
 
 
@@ -381,21 +757,22 @@ def _extract_attendee_phone(booking: Dict[str, Any]) -> Optional[str]:
     Returns:
         Phone number if found, None otherwise
     """
-    # Check bookingFieldsResponses (custom fields from booking form)
-    booking_fields = booking.get('bookingFieldsResponses', {})
-    if isinstance(booking_fields, dict):
+    # Check bookingFieldsResponses first (custom fields from booking form;
+    # where Cal.com v2 usually puts the phone)
+    booking_fields = booking.get('bookingFieldsResponses')
+    if booking_fields and isinstance(booking_fields, dict):
         phone = booking_fields.get('phone')
         if phone:
             return str(phone)
     
-    # Check attendees' phone field if available
-    attendees = booking.get('attendees', [])
-    if attendees:
-        attendee_phone = attendees[0].get('phone')
-        if attendee_phone:
-            return str(attendee_phone)
-    
-    return None
+    # Then the first attendee's phone field
+    attendees = booking.get('attendees')
+    phone = attendees[0].get('phone') if attendees else None
+    return str(phone) if phone else None
+
+
+# Deletion table for every non-digit ASCII character
+_PHONE_KEEP_DIGITS = str.maketrans('', '', ''.join(chr(c) for c in range(128) if not chr(c).isdigit()))
 
 
 def _normalize_phone(phone: str) -> str:
@@ -411,33 +788,84 @@ def _normalize_phone(phone: str) -> str:
     """
     if not phone:
         return ""
-    return ''.join(filter(str.isdigit, str(phone)))
+    phone = str(phone)
+    if phone.isascii():
+        # One C-level pass deleting every non-digit ASCII character
+        return phone.translate(_PHONE_KEEP_DIGITS)
+    return ''.join(filter(str.isdigit, phone))
+
 
+# Booking-side phones repeat across lookups of the same patient
+_normalize_booking_phone = lru_cache(maxsize=512)(_normalize_phone)
 
-def _phones_match(user_phone: str, booking_phone: str) -> bool:
+
+def _phones_match(user_normalized: str, booking_phone: str) -> bool:
     """
     Check if phone numbers match.
     Handles different formats by normalizing both.
     
     Args:
-        user_phone: Phone provided by user
+        user_normalized: Phone provided by user, already normalized by the caller
         booking_phone: Phone from CalCom booking
         
     Returns:
         True if phones match, False otherwise
     """
-    if not user_phone or not booking_phone:
+    if not booking_phone:
         return False
     
-    user_normalized = _normalize_phone(user_phone)
-    booking_normalized = _normalize_phone(booking_phone)
+    booking_normalized = _normalize_booking_phone(booking_phone)
     
     # Match if normalized numbers are the same
     match = user_normalized == booking_normalized
-    logger.debug(f"Phone matching: user={user_normalized}, booking={booking_normalized}, match={match}")
+    logger.debug("Phone matching: user=%s, booking=%s, match=%s", user_normalized, booking_normalized, match)
     return match
 
 
+def _index_bookings(bookings: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Index bookings (by position) on normalized attendee phone and name words:
+    {'by_phone': {digits: [i, ...]}, 'by_word': {word: {i, ...}}}.
+    """
+    by_phone: Dict[str, List[int]] = defaultdict(list)
+    by_word: Dict[str, set] = defaultdict(set)
+    for i, booking in enumerate(bookings):
+        attendees = booking.get('attendees', [])
+        if not attendees:
+            continue
+        for word in _stored_name_words(attendees[0].get('name', '')):
+            by_word[word].add(i)
+        booking_phone = _extract_attendee_phone(booking)
+        if booking_phone:
+            by_phone[_normalize_booking_phone(booking_phone)].append(i)
+    return {'by_phone': by_phone, 'by_word': by_word}
+
+
+def _candidate_bookings(
+    bookings: List[Dict[str, Any]],
+    user_words: AbstractSet[str],
+    user_phone: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    Narrow bookings to those that can pass the name/phone filters, using an
+    index instead of testing every booking. Keeps the original order; the
+    caller still applies the full filters to each candidate.
+    """
+    if not user_words and user_phone is None:
+        return bookings
+
+    index = _index_bookings(bookings)
+    candidates: Optional[set] = None
+    if user_phone is not None:
+        candidates = set(index['by_phone'].get(user_phone, ()))
+    for word in user_words:
+        word_hits = index['by_word'].get(word, set())
+        candidates = word_hits if candidates is None else candidates & word_hits
+        if not candidates:
+            return []
+    return [bookings[i] for i in sorted(candidates)]
+
+
 def find_booking_by_patient_info(
     patient_name: str = None,
     patient_email: str = None,
@@ -445,6 +873,42 @@ def find_booking_by_patient_info(
     appointment_time: datetime = None,
     appointment_date: datetime = None,
     search_days: int = 30
+) -> Optional[Dict[str, Any]]:
+    """
+    Find a patient's booking (see _lookup_booking_by_patient_info), sharing
+    found bookings across workers for BOOKING_LOOKUP_CACHE_TTL when the shared
+    cache is configured. Any booking change invalidates every shared result.
+    """
+    shared_generation = shared_cache.get_generation("booking_lookup") if patient_email else None
+    if shared_generation is None:
+        return _lookup_booking_by_patient_info(
+            patient_name, patient_email, patient_phone, appointment_time, appointment_date, search_days
+        )
+
+    shared_key = (
+        f"booking_lookup:{shared_generation}:{CALCOM_EVENT_TYPE_ID}:{patient_email.lower()}:"
+        f"{patient_name or ''}:{patient_phone or ''}:{appointment_time or ''}:{appointment_date or ''}"
+    )
+    booking = shared_cache.get_json(shared_key)
+    if booking is not None:
+        logger.info(f"[LOOKUP] Using shared cached booking {booking.get('uid')} for {patient_email}")
+        return booking
+    booking = _lookup_booking_by_patient_info(
+        patient_name, patient_email, patient_phone, appointment_time, appointment_date, search_days
+    )
+    # Misses aren't shared: they may be a failed request, not "no booking"
+    if booking:
+        shared_cache.set_json(shared_key, booking, ex=max(1, BOOKING_LOOKUP_CACHE_TTL))
+    return booking
+
+
+def _lookup_booking_by_patient_info(
+    patient_name: str = None,
+    patient_email: str = None,
+    patient_phone: str = None,
+    appointment_time: datetime = None,
+    appointment_date: datetime = None,
+    search_days: int = 30
 ) -> Optional[Dict[str, Any]]:
     """
     Find a patient's booking in CalCom using optimized API flow.
@@ -483,14 +947,11 @@ def find_booking_by_patient_info(
                 date_obj = datetime.fromisoformat(appointment_date)
             else:
                 date_obj = appointment_date
-            start_dt = date_obj.replace(hour=0, minute=0, second=0, tzinfo=ZoneInfo("UTC"))
-            end_dt = date_obj.replace(hour=23, minute=59, second=59, tzinfo=ZoneInfo("UTC"))
+            start_dt = date_obj.replace(hour=0, minute=0, second=0, tzinfo=_UTC)
+            end_dt = date_obj.replace(hour=23, minute=59, second=59, tzinfo=_UTC)
         else:
             # Default: use standard 90-day window (today to 90 days ahead)
-            start_dt, _ = _get_standard_date_range(90)
-            start_dt = datetime.fromisoformat(start_dt)
-            _, end_dt = _get_standard_date_range(90)
-            end_dt = datetime.fromisoformat(end_dt)
+            start_dt, end_dt = _get_standard_date_range_dt(90)
         
         # Require at least email or name for lookup
         if not patient_email and not patient_name:
@@ -527,7 +988,11 @@ def find_booking_by_patient_info(
         # ========== STEP 2: Filter results by name & phone (Python-side) ==========
         matching_bookings = []
         
-        for booking in bookings:
+        # User-side inputs are loop-invariant; normalize them once
+        user_words = _normalize_name(patient_name)
+        user_phone = _normalize_phone(patient_phone)
+        
+        for booking in _candidate_bookings(bookings, user_words, user_phone if patient_phone else None):
             attendees = booking.get('attendees', [])
             if not attendees:
                 continue
@@ -538,25 +1003,25 @@ def find_booking_by_patient_info(
             
             # --- Name Filter (optional, smart word-matching) ---
             if patient_name:
-                if not _names_match(patient_name, attendee_name):
-                    logger.debug(f"[LOOKUP] ✗ Name mismatch: user='{patient_name}' vs booking='{attendee_name}'")
+                if not _names_match(user_words, attendee_name):
+                    logger.debug("[LOOKUP] ✗ Name mismatch: user='%s' vs booking='%s'", patient_name, attendee_name)
                     continue
-                logger.debug(f"[LOOKUP] ✓ Name match: '{patient_name}' matches '{attendee_name}'")
+                logger.debug("[LOOKUP] ✓ Name match: '%s' matches '%s'", patient_name, attendee_name)
             
             # --- Phone Filter (optional, normalized matching) ---
             if patient_phone:
                 booking_phone = _extract_attendee_phone(booking)
-                if not booking_phone or not _phones_match(patient_phone, booking_phone):
-                    logger.debug(f"[LOOKUP] ✗ Phone mismatch: user='{patient_phone}' vs booking='{booking_phone}'")
+                if not booking_phone or not _phones_match(user_phone, booking_phone):
+                    logger.debug("[LOOKUP] ✗ Phone mismatch: user='%s' vs booking='%s'", patient_phone, booking_phone)
                     continue
-                logger.debug(f"[LOOKUP] ✓ Phone match: '{patient_phone}' matches '{booking_phone}'")
+                logger.debug("[LOOKUP] ✓ Phone match: '%s' matches '%s'", patient_phone, booking_phone)
             
             # --- Time Filter (optional) ---
             if appointment_time:
                 if not _matches_appointment_time(booking, appointment_time):
-                    logger.debug(f"[LOOKUP] ✗ Time mismatch for {attendee_email}")
+                    logger.debug("[LOOKUP] ✗ Time mismatch for %s", attendee_email)
                     continue
-                logger.debug(f"[LOOKUP] ✓ Time match for {attendee_email}")
+                logger.debug("[LOOKUP] ✓ Time match for %s", attendee_email)
             
             # ✓ All filters passed - this is a match!
             matching_bookings.append(booking)
@@ -569,7 +1034,7 @@ def find_booking_by_patient_info(
         # Return the most recent booking if multiple matches
         if len(matching_bookings) > 1:
             logger.info(f"[LOOKUP] Found {len(matching_bookings)} matching bookings, returning most recent")
-            booking = sorted(matching_bookings, key=lambda b: b.get('start', ''), reverse=True)[0]
+            booking = max(matching_bookings, key=lambda b: b.get('start', ''))
         else:
             booking = matching_bookings[0]
         
@@ -622,13 +1087,10 @@ def find_all_bookings_by_patient_info(
                 date_obj = datetime.fromisoformat(appointment_date)
             else:
                 date_obj = appointment_date
-            start_dt = date_obj.replace(hour=0, minute=0, second=0, tzinfo=ZoneInfo("UTC"))
-            end_dt = date_obj.replace(hour=23, minute=59, second=59, tzinfo=ZoneInfo("UTC"))
+            start_dt = date_obj.replace(hour=0, minute=0, second=0, tzinfo=_UTC)
+            end_dt = date_obj.replace(hour=23, minute=59, second=59, tzinfo=_UTC)
         else:
-            start_dt, _ = _get_standard_date_range(90)
-            start_dt = datetime.fromisoformat(start_dt)
-            _, end_dt = _get_standard_date_range(90)
-            end_dt = datetime.fromisoformat(end_dt)
+            start_dt, end_dt = _get_standard_date_range_dt(90)
         
         if not patient_email and not patient_name:
             logger.warning("[LOOKUP_ALL] No patient email or name provided")
@@ -649,7 +1111,11 @@ def find_all_bookings_by_patient_info(
         
         matching_bookings = []
         
-        for booking in bookings:
+        # User-side inputs are loop-invariant; normalize them once
+        user_words = _normalize_name(patient_name)
+        user_phone = _normalize_phone(patient_phone)
+        
+        for booking in _candidate_bookings(bookings, user_words, user_phone if patient_phone else None):
             attendees = booking.get('attendees', [])
             if not attendees:
                 continue
@@ -657,12 +1123,12 @@ def find_all_bookings_by_patient_info(
             attendee = attendees[0]
             attendee_name = attendee.get('name', '')
             
-            if patient_name and not _names_match(patient_name, attendee_name):
+            if patient_name and not _names_match(user_words, attendee_name):
                 continue
             
             if patient_phone:
                 booking_phone = _extract_attendee_phone(booking)
-                if not booking_phone or not _phones_match(patient_phone, booking_phone):
+                if not booking_phone or not _phones_match(user_phone, booking_phone):
                     continue
             
             matching_bookings.append(booking)
@@ -680,6 +1146,73 @@ def find_all_bookings_by_patient_info(
         return []
 
 
+# "10:00", "2:30 PM", "10:30:00 am" -> hour, minute, optional meridiem
+_TIME_RE = re.compile(r'\s*(\d{1,2}):(\d{2})(?::\d{2})?\s*(AM|PM)?', re.IGNORECASE)
+
+# A requested time reduced to what must match: (date or None, hour, minute or None)
+_TimeTarget = Tuple[Optional[date], int, Optional[int]]
+
+
+def _try_iso(appointment_time: Any, user_tz: ZoneInfo) -> Optional[_TimeTarget]:
+    """Full ISO datetime string (e.g. "2026-02-09T10:00:00+05:30"): match date and hour."""
+    if not isinstance(appointment_time, str) or 'T' not in appointment_time:
+        return None
+    try:
+        requested_dt = datetime.fromisoformat(appointment_time.replace('Z', '+00:00'))
+    except ValueError:
+        return None  # Fall through to time-only parsing
+    
+    # If timezone-naive, assume user's timezone; otherwise convert to it
+    if requested_dt.tzinfo is None:
+        requested_dt = requested_dt.replace(tzinfo=user_tz)
+    else:
+        requested_dt = requested_dt.astimezone(user_tz)
+    return requested_dt.date(), requested_dt.hour, None
+
+
+def _try_clock_str(appointment_time: Any, user_tz: ZoneInfo) -> Optional[_TimeTarget]:
+    """Time-only string (e.g. "10:00", "2:30 PM"): match hour and minute."""
+    if not isinstance(appointment_time, str) or ':' not in appointment_time:
+        return None
+    time_match = _TIME_RE.match(appointment_time)
+    if not time_match:
+        logger.debug("Could not parse time string: %s", appointment_time)
+        return None
+    
+    search_hour = int(time_match.group(1))
+    meridiem = (time_match.group(3) or '').upper()
+    
+    # Convert 12-hour format to 24-hour if needed
+    if meridiem == 'PM' and search_hour != 12:
+        search_hour += 12
+    elif meridiem == 'AM' and search_hour == 12:
+        search_hour = 0
+    return None, search_hour, int(time_match.group(2))
+
+
+def _try_dt_obj(appointment_time: Any, user_tz: ZoneInfo) -> Optional[_TimeTarget]:
+    """datetime object: match hour and minute in the user's timezone."""
+    if not isinstance(appointment_time, datetime):
+        return None
+    if appointment_time.tzinfo is None:
+        requested_dt = appointment_time.replace(tzinfo=user_tz)
+    else:
+        requested_dt = appointment_time.astimezone(user_tz)
+    return None, requested_dt.hour, requested_dt.minute
+
+
+# Tried in order; the first parser that recognizes the input decides the match
+_TIME_PARSERS = (_try_iso, _try_clock_str, _try_dt_obj)
+
+
+def _booking_local_start(booking: Dict[str, Any], user_tz: ZoneInfo) -> Optional[datetime]:
+    """Booking start (stored in UTC in Cal.com) in the user's timezone."""
+    booking_time_str = booking.get('start') or booking.get('startTime', '')
+    if not booking_time_str:
+        return None
+    return datetime.fromisoformat(booking_time_str.replace('Z', '+00:00')).astimezone(user_tz)
+
+
 def _matches_appointment_time(booking: Dict[str, Any], appointment_time: str, timezone_name: str = "Asia/Kolkata") -> bool:
     """
     Helper function to check if booking time matches requested time.
@@ -694,74 +1227,25 @@ def _matches_appointment_time(booking: Dict[str, Any], appointment_time: str, ti
         True if times match, False otherwise
     """
     try:
-        # Get booking start time (stored in UTC in Cal.com)
-        booking_time_str = booking.get('start') or booking.get('startTime', '')
-        if not booking_time_str:
+        user_tz = _get_tz(timezone_name)
+        
+        target = None
+        for parse in _TIME_PARSERS:
+            target = parse(appointment_time, user_tz)
+            if target is not None:
+                break
+        if target is None:
             return False
-            
-        # Parse booking time and convert to user timezone
-        booking_dt_utc = datetime.fromisoformat(booking_time_str.replace('Z', '+00:00'))
-        user_tz = ZoneInfo(timezone_name)
-        booking_dt_local = booking_dt_utc.astimezone(user_tz)
         
-        # Handle full ISO datetime strings (e.g., "2026-02-09T10:00:00+05:30")
-        if isinstance(appointment_time, str) and 'T' in appointment_time:
-            try:
-                # Try to parse as ISO datetime
-                requested_dt = datetime.fromisoformat(appointment_time.replace('Z', '+00:00'))
-                
-                # If timezone-naive, assume user's timezone
-                if requested_dt.tzinfo is None:
-                    requested_dt = requested_dt.replace(tzinfo=user_tz)
-                else:
-                    # Convert to user's timezone for comparison
-                    requested_dt = requested_dt.astimezone(user_tz)
-                
-                # Compare date and hour (user timezone)
-                return (booking_dt_local.year == requested_dt.year and 
-                        booking_dt_local.month == requested_dt.month and 
-                        booking_dt_local.day == requested_dt.day and 
-                        booking_dt_local.hour == requested_dt.hour)
-            except ValueError:
-                pass  # Fall through to time-only parsing
+        booking_dt_local = _booking_local_start(booking, user_tz)
+        if booking_dt_local is None:
+            return False
         
-        # Handle time-only strings (e.g., "10:00", "2:30 PM", "10:30 AM")
-        if isinstance(appointment_time, str) and ':' in appointment_time:
-            # Extract time components
-            time_str = appointment_time.strip().upper()
-            
-            # Parse hour:minute format
-            time_parts = time_str.split(':')
-            if len(time_parts) < 2:
-                return False
-                
-            try:
-                search_hour = int(time_parts[0])
-                search_minute = int(time_parts[1].split()[0])  # Handle "30 PM" format
-                
-                # Convert 12-hour format to 24-hour if needed
-                if 'PM' in time_str and search_hour != 12:
-                    search_hour += 12
-                elif 'AM' in time_str and search_hour == 12:
-                    search_hour = 0
-                
-                # Compare in user's timezone
-                # Check hour and minute (allow some tolerance for seconds)
-                return (booking_dt_local.hour == search_hour and 
-                        booking_dt_local.minute == search_minute)
-                        
-            except (ValueError, IndexError):
-                logger.debug(f"Could not parse time string: {appointment_time}")
-                return False
-        elif isinstance(appointment_time, datetime):
-            # If datetime object provided, compare in user's timezone
-            if appointment_time.tzinfo is None:
-                requested_dt = appointment_time.replace(tzinfo=user_tz)
-            else:
-                requested_dt = appointment_time.astimezone(user_tz)
-            
-            return (booking_dt_local.hour == requested_dt.hour and 
-                    booking_dt_local.minute == requested_dt.minute)
+        # Compare in user's timezone
+        target_date, target_hour, target_minute = target
+        return (booking_dt_local.hour == target_hour and
+                (target_minute is None or booking_dt_local.minute == target_minute) and
+                (target_date is None or booking_dt_local.date() == target_date))
     except Exception as e:
         logger.warning(f"Error matching appointment time: {e}")
     
@@ -769,11 +1253,118 @@ def _matches_appointment_time(booking: Dict[str, Any], appointment_time: str, ti
 # GET AVAILABILITY
 # ----------------------------
 
+@lru_cache(maxsize=1024)
+def _iso_to_epoch(iso: str) -> int:
+    """Integer epoch seconds for a Cal.com ISO timestamp; upcoming bookings
+    repeat across availability calls, so results are cached."""
+    return int(datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp())
+
+
 def get_availability(
     start: str,
     end: str,
     timezone_name: str = "Asia/Kolkata",
     duration_minutes: int = None
+) -> Dict[str, Any]:
+    """
+    Availability for the range, reusing an identical query's result for
+    AVAILABILITY_CACHE_TTL seconds (dropped whenever a booking changes).
+    Checks this process first, then the shared cache when one is configured;
+    concurrent identical misses share a single computation.
+    The returned dict may be shared between callers, so treat it as read-only.
+    """
+    key = (start, end, timezone_name, duration_minutes)
+    with _prefetch_lock:
+        cached = _availability_cache.get(key)
+        if cached and time.monotonic() - cached[0] < AVAILABILITY_CACHE_TTL:
+            logger.info(f"[AVAILABILITY] Using cached availability for {start} to {end} [{timezone_name}]")
+            return cached[1]
+        pending = _availability_pending.get(key)
+        if pending is None:
+            future = _availability_pending[key] = Future()
+            generation = _bookings_generation
+    if pending is not None:
+        logger.info(f"[AVAILABILITY] Joining in-flight availability lookup for {start} to {end} [{timezone_name}]")
+        return pending.result()
+
+    try:
+        result = _load_availability(start, end, timezone_name, duration_minutes)
+    except BaseException as e:
+        with _prefetch_lock:
+            if _availability_pending.get(key) is future:
+                del _availability_pending[key]
+        future.set_exception(e)
+        raise
+
+    with _prefetch_lock:
+        if _availability_pending.get(key) is future:
+            del _availability_pending[key]
+        if generation == _bookings_generation:
+            _store_with_ttl(_availability_cache, key, result, AVAILABILITY_CACHE_TTL)
+    future.set_result(result)
+    return result
+
+
+def _load_availability(
+    start: str,
+    end: str,
+    timezone_name: str,
+    duration_minutes: Optional[int]
+) -> Dict[str, Any]:
+    """Availability from the shared cache when configured, otherwise computed (and shared)."""
+    shared_generation = shared_cache.get_generation("availability")
+    if shared_generation is None:
+        return _compute_availability(start, end, timezone_name, duration_minutes)
+
+    shared_key = f"availability:{shared_generation}:{CALCOM_EVENT_TYPE_ID}:{start}:{end}:{timezone_name}:{duration_minutes}"
+    result = shared_cache.get_json(shared_key)
+    if result is not None:
+        logger.info(f"[AVAILABILITY] Using shared cached availability for {start} to {end} [{timezone_name}]")
+        return result
+    result = _compute_availability(start, end, timezone_name, duration_minutes)
+    shared_cache.set_json(shared_key, result, ex=max(1, int(AVAILABILITY_CACHE_TTL)))
+    return result
+
+
+def _fetch_slots(
+    start_dt: datetime,
+    end_dt: datetime,
+    timezone_name: str,
+    duration_minutes: Optional[int]
+) -> Optional[Dict[str, List[Dict[str, str]]]]:
+    """
+    Bookable slots straight from Cal.com's /slots endpoint, grouped by date
+    as {"YYYY-MM-DD": [{"start": iso}, ...]}, or None if the call fails.
+    """
+    params = {
+        "eventTypeId": CALCOM_EVENT_TYPE_ID,
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+        "timeZone": timezone_name
+    }
+    if duration_minutes is not None:
+        params["duration"] = duration_minutes
+    try:
+        response = _get_with_retry(f"{CALCOM_BASE_URL}/slots", headers=HEADERS_SLOTS, params=params)
+        if not response.ok:
+            logger.warning(f"[AVAILABILITY] Slots request failed: {response.status_code}")
+            return None
+        data = _loads(response.content).get("data")
+        if not isinstance(data, dict):
+            logger.warning("[AVAILABILITY] Unexpected slots response shape")
+            return None
+        # Only include dates that have available slots
+        return {date_key: day_slots for date_key, day_slots in data.items() if day_slots}
+    except Exception as e:
+        logger.warning(f"[AVAILABILITY] Slots request error: {e}")
+        return None
+
+
+def _compute_availability(
+    start: str,
+    end: str,
+    timezone_name: str = "Asia/Kolkata",
+    duration_minutes: int = None
 ) -> Dict[str, Any]:
     """
     Get availability using hybrid approach.
@@ -791,7 +1382,7 @@ def get_availability(
     end_dt = datetime.fromisoformat(end_iso.replace("Z", "+00:00"))
     
     # Enforce date range constraints
-    today = datetime.now(ZoneInfo("UTC")).replace(hour=0, minute=0, second=0, microsecond=0)
+    today = datetime.now(_UTC).replace(hour=0, minute=0, second=0, microsecond=0)
     max_date = today + timedelta(days=90)
     
     if start_dt.date() < today.date():
@@ -802,10 +1393,24 @@ def get_availability(
         logger.warning(f"[AVAILABILITY] End date {end_dt.date()} exceeds 90-day limit, capping at {max_date.date()}")
         end_dt = max_date.replace(hour=23, minute=59, second=59)
 
+    if CALCOM_SLOTS_API:
+        slots = _fetch_slots(start_dt, end_dt, timezone_name, duration_minutes)
+        if slots is not None:
+            logger.info(f"[AVAILABILITY] Cal.com returned slots for {len(slots)} days")
+            return {
+                "status": "success",
+                "data": slots
+            }
+        logger.info("[AVAILABILITY] Falling back to schedule-based availability")
+
     logger.info(f"Generating availability from schedule for eventType={CALCOM_EVENT_TYPE_ID} "
                 f"from {start_dt.isoformat()} to {end_dt.isoformat()} [{timezone_name}]")
     logger.info(f"✓ CalCom API Filter: status=upcoming&afterStart={start_dt.isoformat()}&beforeEnd={end_dt.isoformat()}")
 
+    # Schedule and bookings are independent, so fetch them concurrently
+    # Only upcoming bookings block availability (Cal.com filters server-side)
+    bookings_future = _executor.submit(get_bookings, start_dt, end_dt, "upcoming")
+
     # Get schedule info and generate slots
     schedule = get_first_schedule()
     logger.info(f"Using schedule: {schedule['name']}")
@@ -814,15 +1419,12 @@ def get_availability(
     if duration_minutes is None:
         duration_minutes = 30  # Default duration
         
-    all_slots = generate_slots_from_schedule(schedule, start_dt, end_dt, duration_minutes, timezone_name)
+    all_slots = _bookable_slots(schedule, start_dt, end_dt, duration_minutes, timezone_name)
     
-    # Fetch upcoming bookings only (Cal.com filters server-side)
-    # Only upcoming bookings block availability
-    existing_bookings = get_bookings(start_dt, end_dt, status="upcoming")
+    existing_bookings = bookings_future.result()
     
-    # Create set of blocked time slots (including duration)
-    blocked_times = set()
-    tz = ZoneInfo(timezone_name)
+    # Blocked time windows as integer epoch seconds (start, end)
+    blocked_times = []
     
     for booking in existing_bookings:
         # Parse booking start time and duration
@@ -831,44 +1433,46 @@ def get_availability(
         
         if booking_start:
             try:
-                # Convert booking time to target timezone
-                booking_dt = datetime.fromisoformat(booking_start.replace("Z", "+00:00"))
-                booking_dt_tz = booking_dt.astimezone(tz)
-                booking_end_dt_tz = booking_dt_tz + timedelta(minutes=booking_duration)
+                booking_epoch = _iso_to_epoch(booking_start)
                 
                 # Add the exact booking window to blocked times
                 # We'll check overlaps during slot filtering
-                blocked_times.add((booking_dt_tz, booking_end_dt_tz))
+                blocked_times.append((booking_epoch, booking_epoch + booking_duration * 60))
                     
-                logger.debug(f"Booking: {booking_dt_tz.isoformat()} to {booking_end_dt_tz.isoformat()}")
+                logger.debug("Booking: %s for %s min", booking_start, booking_duration)
             except Exception as e:
                 logger.warning(f"Failed to parse booking time {booking_start}: {e}")
     logger.info(f"Found {len(existing_bookings)} bookings")
     
-    # Filter out booked slots
+    # Filter out booked slots with one sweep: slots come in time order, so
+    # walk the start-sorted bookings with a single pointer (O(S + B))
     available_slots = {}
     total_slots = 0
     available_count = 0
-    
-    for date_key, slots in all_slots.items():
+    slot_seconds = duration_minutes * 60
+    blocked_times.sort()
+    # Parallel start/end lists so the sweep does flat integer compares
+    blocked_starts = [start for start, _ in blocked_times]
+    blocked_ends = [end for _, end in blocked_times]
+    blocked_count = len(blocked_times)
+    j = 0
+    
+    for date_key, slots in all_slots:
         available_day_slots = []
-        for slot in slots:
+        for slot_epoch, slot_iso in slots:
             total_slots += 1
-            slot_time = slot["start"]
-            slot_dt = datetime.fromisoformat(slot_time)
-            slot_end_dt = slot_dt + timedelta(minutes=duration_minutes)
             
-            # Check if this slot overlaps with any booking
-            is_blocked = False
-            for booking_start, booking_end in blocked_times:
-                # Slot overlaps with booking if:
-                # - Slot starts before booking ends AND slot ends after booking starts
-                if slot_dt < booking_end and slot_end_dt > booking_start:
-                    is_blocked = True
-                    break
+            # Skip bookings that end before this (and every later) slot starts
+            while j < blocked_count and blocked_ends[j] <= slot_epoch:
+                j += 1
+            
+            # Slot overlaps with booking if:
+            # - Slot starts before booking ends AND slot ends after booking starts
+            # Later bookings start no earlier than booking j, so it alone decides
+            is_blocked = j < blocked_count and blocked_starts[j] < slot_epoch + slot_seconds
             
             if not is_blocked:
-                available_day_slots.append(slot)
+                available_day_slots.append({"start": slot_iso})
                 available_count += 1
         
         # Only include dates that have available slots
@@ -883,6 +1487,32 @@ def get_availability(
         "data": available_slots
     }
 
+# ----------------------------
+# SLOT HOLDS
+# ----------------------------
+
+# Seconds a slot stays held for the session that is booking it
+SLOT_HOLD_TTL = 60
+
+
+def _slot_hold_key(start_time: str) -> str:
+    # Keyed on the instant, so one slot maps to one key whatever its UTC offset
+    return f"hold:{CALCOM_EVENT_TYPE_ID}:{_iso_to_epoch(start_time)}"
+
+
+def hold_slot(start_time: str, owner: str) -> bool:
+    """
+    Hold a slot for owner (a session id) across worker processes while the
+    booking is placed. False means another session holds it; always True
+    without a shared cache.
+    """
+    return shared_cache.try_hold(_slot_hold_key(start_time), owner, SLOT_HOLD_TTL)
+
+
+def release_slot(start_time: str, owner: str) -> None:
+    """Release owner's hold on a slot (e.g. when booking it failed)."""
+    shared_cache.release_hold(_slot_hold_key(start_time), owner)
+
 # ----------------------------
 # BOOK APPOINTMENT
 # ----------------------------
@@ -932,11 +1562,9 @@ def book_appointment(
 
     url = f"{CALCOM_BASE_URL}/bookings"
     
-    # Add API version header for booking
-    booking_headers = HEADERS.copy()
-    booking_headers["cal-api-version"] = "2024-08-13"
-    
-    response = requests.post(url, headers=booking_headers, json=payload)
+    _rate_limiter.acquire()
+    response = _http.post(url, headers=HEADERS_V2, json=payload, timeout=CALCOM_TIMEOUT)
+    invalidate_bookings_cache(email)
     
     if not response.ok:
         logger.error(f"Booking failed with status {response.status_code}")
@@ -945,7 +1573,7 @@ def book_appointment(
         # Parse error message for user-friendly response
         error_message = "Booking failed"
         try:
-            error_json = response.json()
+            error_json = _loads(response.content)
             logger.error(f"Error JSON: {error_json}")
             
             # Extract the actual error message
@@ -963,7 +1591,7 @@ def book_appointment(
             "details": f"Cal.com API returned status {response.status_code}"
         }
     
-    return response.json()
+    return _loads(response.content)
 
 # ----------------------------
 # CANCEL APPOINTMENT
@@ -993,13 +1621,12 @@ def cancel_appointment(
         "cancellationReason": cancellation_reason
     }
     
-    # Add API version header for cancellation
-    cancel_headers = HEADERS.copy()
-    cancel_headers["cal-api-version"] = "2024-08-13"
-    
     logger.info(f"[CANCEL_APPOINTMENT] Cancelling booking {booking_uid}")
     
-    response = requests.post(url, headers=cancel_headers, json=payload)
+    _rate_limiter.acquire()
+    response = _http.post(url, headers=HEADERS_V2, json=payload, timeout=CALCOM_TIMEOUT)
+    # Only the booking UID is known here, so drop every attendee's entries
+    invalidate_bookings_cache()
     
     if not response.ok:
         logger.error(f"[CANCEL_APPOINTMENT] Cancellation failed with status {response.status_code}")
@@ -1008,7 +1635,7 @@ def cancel_appointment(
         # Parse error message for user-friendly response
         error_message = "Cancellation failed"
         try:
-            error_json = response.json()
+            error_json = _loads(response.content)
             logger.error(f"[CANCEL_APPOINTMENT] Error JSON: {error_json}")
             
             # Extract the actual error message
@@ -1027,7 +1654,7 @@ def cancel_appointment(
         }
     
     # Successfully cancelled - add explicit success status
-    response_data = response.json()
+    response_data = _loads(response.content)
     logger.info(f"[CANCEL_APPOINTMENT] ✓ Successfully cancelled booking {booking_uid}")
     logger.info(f"[CANCEL_APPOINTMENT] Response: {response_data}")
     
@@ -12,8 +12,11 @@ import mysql.connector
 from mysql.connector import Error, pooling
 from dotenv import load_dotenv
 import os
+import time
 import hashlib
 
+from ..config.settings import DB_POOL_CONFIG, DB_POOL_ACQUIRE_TIMEOUT, get_zoneinfo
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -48,36 +51,47 @@ class DatabaseService:
             try:
                 DatabaseService._pool = pooling.MySQLConnectionPool(
                     pool_name="dental_clinic_pool",
-                    pool_size=5,
-                    pool_reset_session=True,
-                    **self.config,
-                    autocommit=False,
-                    use_unicode=True,
-                    charset='utf8mb4'
+                    **DB_POOL_CONFIG,
+                    **self.config
                 )
-                logger.info("Connection pool initialized successfully")
+                logger.info(f"Connection pool initialized successfully (size={DB_POOL_CONFIG['pool_size']})")
             except Error as e:
                 logger.error(f"Failed to create connection pool: {e}")
                 raise
     
     def get_connection(self):
-        """Get a database connection from the pool."""
+        """
+        Get a database connection from the pool.
+        
+        mysql-connector raises immediately when every pooled connection is
+        checked out, so briefly wait for one to be returned instead of
+        failing the caller under concurrent sessions.
+        """
         try:
             if DatabaseService._pool is None:
                 self._init_pool()
-            return DatabaseService._pool.get_connection()
+            deadline = time.monotonic() + DB_POOL_ACQUIRE_TIMEOUT
+            while True:
+                try:
+                    return DatabaseService._pool.get_connection()
+                except mysql.connector.errors.PoolError:
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.05)
         except Error as e:
             logger.error(f"Database connection error: {e}")
             raise
     
     # ========== SESSION MANAGEMENT ==========
     
-    def create_session(self, room_name: str) -> str:
+    def create_session(self, room_name: str, greeting: str = None) -> str:
         """
         Create a new session record.
         
         Args:
             room_name: LiveKit room name
+            greeting: Optional agent greeting, logged as the first conversation
+                      message in the same transaction as the session row
             
         Returns:
             session_id
@@ -87,12 +101,21 @@ class DatabaseService:
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            now = datetime.now()
             
             query = """
             INSERT INTO sessions (session_id, room_name, start_time, status)
             VALUES (%s, %s, %s, %s)
             """
-            cursor.execute(query, (session_id, room_name, datetime.now(), 'active'))
+            cursor.execute(query, (session_id, room_name, now, 'active'))
+            
+            if greeting:
+                cursor.execute("""
+                INSERT INTO conversation_logs 
+                (session_id, user_id, speaker, message_text, timestamp)
+                VALUES (%s, %s, %s, %s, %s)
+                """, (session_id, None, 'agent', greeting, now))
+            
             conn.commit()
             
             logger.info(f"Created session: {session_id} for room: {room_name}")
@@ -148,75 +171,6 @@ class DatabaseService:
     
     # ========== MESSAGE LOGGING & CONVERSATION ==========
     
-    def get_or_create_user(self, phone: str, name: str = None, email: str = None) -> int:
-        """
-        Get existing user or create new one.
-        Uses normalized phone lookup to avoid duplicates from formatting differences.
-        
-        Args:
-            phone: User's phone number (unique identifier)
-            name: User's name
-            email: User's email
-            
-        Returns:
-            user_id
-        """
-        try:
-            logger.info(f"[GET_OR_CREATE_USER] Starting - phone={phone}, name={name}, email={email}")
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Normalize phone for lookup: digits only
-            normalized_phone = ''.join(filter(str.isdigit, phone)) if phone else ""
-            logger.info(f"[GET_OR_CREATE_USER] Normalized phone: {normalized_phone}")
-            
-            # Check if user exists using normalized phone
-            logger.info(f"[GET_OR_CREATE_USER] Searching for existing user by normalized phone")
-            cursor.execute("""
-                SELECT user_id FROM users 
-                WHERE REPLACE(REPLACE(REPLACE(phone, '-', ''), ' ', ''), '+', '') = %s
-            """, (normalized_phone,))
-            result = cursor.fetchone()
-            
-            if result:
-                user_id = result[0]
-                logger.info(f"[GET_OR_CREATE_USER] ✓ Found existing user {user_id}, updating last_contact_date")
-                # Update last_contact_date
-                cursor.execute(
-                    "UPDATE users SET last_contact_date = %s WHERE user_id = %s",
-                    (datetime.now(), user_id)
-                )
-                logger.info(f"[GET_OR_CREATE_USER] UPDATE successful, affected rows: {cursor.rowcount}")
-                conn.commit()
-                logger.info(f"[GET_OR_CREATE_USER] ✓ Transaction committed. Returning existing user_id: {user_id}")
-                return user_id
-            
-            # Create new user
-            logger.info(f"[GET_OR_CREATE_USER] User not found, creating new user")
-            query = """
-            INSERT INTO users (phone, name, email, first_contact_date, last_contact_date)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (phone, name, email, datetime.now(), datetime.now()))
-            logger.info(f"[GET_OR_CREATE_USER] INSERT successful, affected rows: {cursor.rowcount}")
-            
-            conn.commit()
-            user_id = cursor.lastrowid
-            logger.info(f"[GET_OR_CREATE_USER] ✓ Transaction committed. Created new user {user_id} with phone={phone}, name={name}, email={email}")
-            return user_id
-            
-        except Error as e:
-            logger.error(f"[GET_OR_CREATE_USER] ✗ Error managing user: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
-            raise
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-            logger.info(f"[GET_OR_CREATE_USER] Connection closed")
-    
     def update_user(self, user_id: int, **kwargs):
         """Update user information."""
         allowed_fields = ['name', 'email', 'notes']
@@ -244,82 +198,6 @@ class DatabaseService:
             cursor.close()
             conn.close()
     
-    def upsert_user_contact(self, name: str, phone: str, email: str, calcom_uid: str = None) -> int:
-        """
-        Insert new user or update last_contact_date for existing user.
-        NEVER overwrites existing phone/email (preserves original contact info).
-        
-        Args:
-            name: Patient's full name
-            phone: Patient's phone number
-            email: Patient's email address
-            calcom_uid: Optional CalCom booking UID (not stored, for reference only)
-            
-        Returns:
-            user_id (newly created or existing)
-        """
-        try:
-            logger.info(f"[UPSERT_USER] Starting - name={name}, phone={phone}, email={email}")
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Normalize phone for lookup: digits only
-            normalized_phone = ''.join(filter(str.isdigit, phone)) if phone else ""
-            logger.info(f"[UPSERT_USER] Normalized phone: {normalized_phone}")
-            
-            # Try to find existing user by normalized phone
-            logger.info(f"[UPSERT_USER] Searching for existing user by normalized phone")
-            cursor.execute("""
-                SELECT user_id FROM users 
-                WHERE REPLACE(REPLACE(REPLACE(phone, '-', ''), ' ', ''), '+', '') = %s
-            """, (normalized_phone,))
-            result = cursor.fetchone()
-            
-            if result:
-                # User exists - only update last_contact_date, NEVER touch phone/email
-                user_id = result[0]
-                logger.info(f"[UPSERT_USER] ✓ Found existing user {user_id}, updating last_contact_date")
-                cursor.execute(
-                    "UPDATE users SET last_contact_date = %s WHERE user_id = %s",
-                    (datetime.now(), user_id)
-                )
-                logger.info(f"[UPSERT_USER] UPDATE successful, affected rows: {cursor.rowcount}")
-                conn.commit()
-                logger.info(f"[UPSERT_USER] ✓ Transaction committed for existing user {user_id}")
-                return user_id
-            
-            # User does NOT exist - create new user
-            logger.info(f"[UPSERT_USER] User not found, creating new user")
-            query = """
-            INSERT INTO users (phone, name, email, first_contact_date, last_contact_date)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (
-                phone, 
-                name.strip() if name else None, 
-                email.strip() if email else None, 
-                datetime.now(), 
-                datetime.now()
-            ))
-            logger.info(f"[UPSERT_USER] INSERT successful, affected rows: {cursor.rowcount}")
-            
-            conn.commit()
-            user_id = cursor.lastrowid
-            logger.info(f"[UPSERT_USER] ✓ Transaction committed. Created new user {user_id} with phone={phone}, name={name}, email={email}")
-            return user_id
-            
-        except Error as e:
-            logger.error(f"[UPSERT_USER] ✗ Error upserting user contact: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
-            raise
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-            logger.info(f"[UPSERT_USER] Connection closed")
-    
     def mark_calcom_sync(self, booking_id: str, calcom_uid: str, sync_status: str = "synced"):
         """
         Mark a booking as synced with CalCom and record sync timestamp.
@@ -390,38 +268,6 @@ class DatabaseService:
             cursor.close()
             conn.close()
     
-    def link_conversation_logs_to_user(self, session_id: str, user_id: int):
-        """
-        Retroactively link all conversation logs for a session to a user.
-        Called when a user is created during booking to associate all past
-        conversation in that session with the user.
-        
-        Args:
-            session_id: Session ID
-            user_id: User ID to link to all logs in this session
-        """
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            query = """
-            UPDATE conversation_logs 
-            SET user_id = %s 
-            WHERE session_id = %s AND user_id IS NULL
-            """
-            cursor.execute(query, (user_id, session_id))
-            updated_rows = cursor.rowcount
-            conn.commit()
-            
-            if updated_rows > 0:
-                logger.info(f"Linked {updated_rows} conversation logs to user {user_id} for session {session_id}")
-            
-        except Error as e:
-            logger.error(f"Error linking conversation logs to user: {e}")
-        finally:
-            cursor.close()
-            conn.close()
-    
     def get_session_conversation(self, session_id: str) -> List[Dict[str, Any]]:
         """Retrieve full conversation for a session."""
         try:
@@ -447,60 +293,188 @@ class DatabaseService:
     
     # ========== BOOKING MANAGEMENT ==========
     
-    def create_booking(
+    def _find_or_create_user(self, cursor, phone: str, name: str, email: str, now: datetime) -> int:
+        """
+        Find a user by normalized phone (digits only) and bump last_contact_date,
+        or create them. Never overwrites an existing user's phone/email.
+        Runs on the caller's cursor; the caller owns the transaction.
+        
+        Returns:
+            user_id
+        """
+        normalized_phone = ''.join(filter(str.isdigit, phone)) if phone else ""
+        cursor.execute("""
+            SELECT user_id FROM users 
+            WHERE REPLACE(REPLACE(REPLACE(phone, '-', ''), ' ', ''), '+', '') = %s
+        """, (normalized_phone,))
+        result = cursor.fetchone()
+        if result:
+            user_id = result[0]
+            cursor.execute(
+                "UPDATE users SET last_contact_date = %s WHERE user_id = %s",
+                (now, user_id)
+            )
+            return user_id
+        
+        cursor.execute("""
+            INSERT INTO users (phone, name, email, first_contact_date, last_contact_date)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (phone, name.strip() if name else None, email.strip() if email else None, now, now))
+        return cursor.lastrowid
+    
+    def _insert_booking(
         self,
+        cursor,
+        booking_id: str,
         session_id: str,
         user_id: int,
         appointment_start: datetime,
         appointment_end: datetime,
-        service_type: str = None,
-        notes: str = None,
-        calcom_uid: str = None
+        service_type: Optional[str],
+        notes: Optional[str],
+        calcom_uid: str,
+        sync_status: str,
+        now: datetime
+    ):
+        """
+        Insert a confirmed booking row already synced with Cal.com and bump the
+        user's booking count. Runs on the caller's cursor; the caller owns the
+        transaction.
+        """
+        cursor.execute("""
+            INSERT INTO bookings 
+            (booking_id, session_id, user_id, appointment_start_time, 
+             appointment_end_time, service_type, status, notes, calcom_uid,
+             calcom_synced, sync_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            booking_id, session_id, user_id, appointment_start,
+            appointment_end, service_type, 'confirmed', notes, calcom_uid,
+            now, sync_status
+        ))
+        cursor.execute(
+            "UPDATE users SET total_bookings = total_bookings + 1 WHERE user_id = %s",
+            (user_id,)
+        )
+    
+    def finalize_booking(
+        self,
+        session_id: str,
+        name: str,
+        phone: str,
+        email: str,
+        appointment_start: datetime,
+        appointment_end: datetime,
+        calcom_uid: str,
+        service_type: str = "General Appointment",
+        notes: str = None
     ) -> str:
         """
-        Create a new booking record.
-        
-        Args:
-            calcom_uid: Cal.com booking UID (important for cancellation/rescheduling)
+        Record a confirmed Cal.com booking in one transaction on one connection:
+        user lookup/creation, linking the session's conversation logs, the
+        booking row (already marked synced), the user's booking count and the
+        booking history entry. Either everything is stored or nothing is.
         
         Returns:
             booking_id
         """
         booking_id = f"book_{uuid.uuid4().hex[:12]}"
-        
+        conn = None
+        cursor = None
         try:
-            logger.info(f"[CREATE_BOOKING] Starting - session_id={session_id}, user_id={user_id}")
+            logger.info(f"[FINALIZE_BOOKING] Starting - session_id={session_id}, phone={phone}, calcom_uid={calcom_uid}")
             conn = self.get_connection()
             cursor = conn.cursor()
+            now = datetime.now()
             
-            logger.info(f"[CREATE_BOOKING] Executing INSERT into bookings table")
-            query = """
-            INSERT INTO bookings 
-            (booking_id, session_id, user_id, appointment_start_time, 
-             appointment_end_time, service_type, status, notes, calcom_uid)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (
-                booking_id, session_id, user_id, appointment_start, 
-                appointment_end, service_type, 'confirmed', notes, calcom_uid
-            ))
-            logger.info(f"[CREATE_BOOKING] INSERT successful, affected rows: {cursor.rowcount}")
+            user_id = self._find_or_create_user(cursor, phone, name, email, now)
+            logger.info(f"[FINALIZE_BOOKING] User {user_id}")
+            
+            # Link this session's earlier conversation logs to the user
+            cursor.execute("""
+                UPDATE conversation_logs 
+                SET user_id = %s 
+                WHERE session_id = %s AND user_id IS NULL
+            """, (user_id, session_id))
+            
+            self._insert_booking(
+                cursor, booking_id, session_id, user_id, appointment_start,
+                appointment_end, service_type, notes, calcom_uid, 'synced', now
+            )
+            
+            cursor.execute("""
+                INSERT INTO booking_history 
+                (booking_id, action, appointment_start_time, changed_at, notes)
+                VALUES (%s, %s, %s, %s, %s)
+            """, (booking_id, 'initial_booking', appointment_start, now, "Booking initial_booking via AI agent"))
             
-            # Update user's total bookings
-            logger.info(f"[CREATE_BOOKING] Updating users.total_bookings for user_id={user_id}")
+            conn.commit()
+            logger.info(f"[FINALIZE_BOOKING] ✓ Transaction committed. Created booking {booking_id} for user {user_id}")
+            return booking_id
+            
+        except Error as e:
+            logger.error(f"[FINALIZE_BOOKING] ✗ Error finalizing booking: {e}", exc_info=True)
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+            if conn:
+                conn.close()
+    
+    def record_reschedule(
+        self,
+        session_id: str,
+        old_calcom_uid: str,
+        new_calcom_uid: Optional[str],
+        name: str,
+        phone: str,
+        email: str,
+        appointment_start: datetime,
+        appointment_end: datetime,
+        service_type: str = None,
+        notes: str = None
+    ) -> Optional[str]:
+        """
+        Record a completed Cal.com reschedule in one transaction on one connection:
+        cancel the old booking row, upsert the user's contact and, when the new
+        Cal.com UID is known, insert the new booking (already marked rescheduled)
+        and bump the user's booking count. Either everything is stored or nothing is.
+        
+        Returns:
+            booking_id of the new local booking, or None if none was created
+        """
+        booking_id = None
+        conn = None
+        cursor = None
+        try:
+            logger.info(f"[RECORD_RESCHEDULE] Starting - old={old_calcom_uid}, new={new_calcom_uid}")
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now()
+            
+            # Reschedules always start from a Cal.com UID; one indexable predicate, no OR
             cursor.execute(
-                "UPDATE users SET total_bookings = total_bookings + 1 WHERE user_id = %s",
-                (user_id,)
+                "UPDATE bookings SET status = %s, notes = %s WHERE calcom_uid = %s",
+                ('cancelled', 'Cancelled due to reschedule by patient', old_calcom_uid)
             )
-            logger.info(f"[CREATE_BOOKING] UPDATE successful, affected rows: {cursor.rowcount}")
             
-            logger.info(f"[CREATE_BOOKING] Committing transaction")
+            user_id = self._find_or_create_user(cursor, phone, name, email, now)
+            
+            if new_calcom_uid and name and email:
+                booking_id = f"book_{uuid.uuid4().hex[:12]}"
+                self._insert_booking(
+                    cursor, booking_id, session_id, user_id, appointment_start,
+                    appointment_end, service_type, notes, new_calcom_uid, 'rescheduled', now
+                )
+            
             conn.commit()
-            logger.info(f"[CREATE_BOOKING] ✓ Transaction committed successfully. Created booking: {booking_id}")
+            logger.info(f"[RECORD_RESCHEDULE] ✓ Transaction committed. Old {old_calcom_uid} cancelled, new booking {booking_id}")
             return booking_id
             
         except Error as e:
-            logger.error(f"[CREATE_BOOKING] ✗ Error creating booking: {e}", exc_info=True)
+            logger.error(f"[RECORD_RESCHEDULE] ✗ Error recording reschedule: {e}", exc_info=True)
             if conn:
                 conn.rollback()
             raise
@@ -509,7 +483,6 @@ class DatabaseService:
                 cursor.close()
             if conn:
                 conn.close()
-            logger.info(f"[CREATE_BOOKING] Connection closed")
     
     def get_booking(self, booking_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve booking details."""
@@ -539,7 +512,7 @@ class DatabaseService:
         Update booking status.
         
         Args:
-            booking_id: Booking ID
+            booking_id: Cal.com booking UID, or the local booking ID
             new_status: 'confirmed', 'cancelled', 'completed', 'rescheduled', 'no-show'
             notes: Optional change notes
         """
@@ -547,12 +520,17 @@ class DatabaseService:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            query = """
-            UPDATE bookings 
-            SET status = %s, notes = %s
-            WHERE booking_id = %s
-            """
-            cursor.execute(query, (new_status, notes, booking_id))
+            # Tools pass the Cal.com UID; fall back to the local ID. Two single-column
+            # lookups instead of one OR, so each uses its own index
+            cursor.execute(
+                "UPDATE bookings SET status = %s, notes = %s WHERE calcom_uid = %s",
+                (new_status, notes, booking_id)
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    "UPDATE bookings SET status = %s, notes = %s WHERE booking_id = %s",
+                    (new_status, notes, booking_id)
+                )
             conn.commit()
             
             logger.info(f"Updated booking {booking_id} status to {new_status}")
@@ -843,9 +821,8 @@ class DatabaseService:
             except:
                 # Try alternative format
                 try:
-                    from zoneinfo import ZoneInfo
                     appointment_dt = datetime.strptime(appointment_time, "%Y-%m-%d %H:%M")
-                    appointment_dt = appointment_dt.replace(tzinfo=ZoneInfo("Asia/Calcutta"))
+                    appointment_dt = appointment_dt.replace(tzinfo=get_zoneinfo("Asia/Kolkata"))
                 except:
                     logger.warning(f"Could not parse appointment time: {appointment_time}")
                     return None
@@ -885,64 +862,6 @@ class DatabaseService:
     
     # ========== ANALYTICS ==========
     
-    def log_booking_to_history(self, booking_id: str, appointment_start_time: datetime = None, reason: str = "initial_booking"):
-        """
-        Create a booking history record for audit trail.
-        booking_history tracks changes to appointments.
-        Uses: history_id (auto), booking_id, action (reason), appointment_start_time, notes, changed_at
-        """
-        conn = None
-        cursor = None
-        try:
-            logger.info(f"[LOG_HISTORY] Starting for booking_id={booking_id}, reason={reason}")
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # If appointment_start_time not provided, fetch it from bookings table
-            if not appointment_start_time:
-                logger.info(f"[LOG_HISTORY] Fetching appointment_start_time from bookings table")
-                cursor.execute(
-                    "SELECT appointment_start_time FROM bookings WHERE booking_id = %s",
-                    (booking_id,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    appointment_start_time = result[0]
-                    logger.info(f"[LOG_HISTORY] ✓ Retrieved appointment_start_time: {appointment_start_time}")
-                else:
-                    logger.warning(f"[LOG_HISTORY] ✗ Could not find appointment time for booking {booking_id}")
-                    return
-            
-            # Insert into booking_history using correct column names
-            logger.info(f"[LOG_HISTORY] Inserting into booking_history table")
-            query = """
-            INSERT INTO booking_history 
-            (booking_id, action, appointment_start_time, changed_at, notes)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            cursor.execute(query, (
-                booking_id,
-                reason,  # action column stores the reason/action type
-                appointment_start_time,
-                datetime.now(),
-                f"Booking {reason} via AI agent"
-            ))
-            logger.info(f"[LOG_HISTORY] INSERT successful, affected rows: {cursor.rowcount}")
-            
-            conn.commit()
-            logger.info(f"[LOG_HISTORY] ✓ Transaction committed. Logged booking {booking_id} to history with reason: {reason}")
-            
-        except Error as e:
-            logger.error(f"[LOG_HISTORY] ✗ Error logging booking to history: {e}", exc_info=True)
-            if conn:
-                conn.rollback()
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
-            logger.info(f"[LOG_HISTORY] Connection closed")
-    
     def update_session_analytics(self):
         """
         Update daily session analytics aggregated from sessions and bookings tables.
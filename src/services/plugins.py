@@ -0,0 +1,64 @@
+"""
+Voice Pipeline Plugins Module
+
+Factories for the LiveKit STT / LLM / TTS / noise-cancellation plugins.
+
+Plugin packages pull in HTTP clients, tokenizers and (for noise
+cancellation) native model runtimes at import time, so they are imported
+lazily inside each factory. Nothing is loaded until a worker process
+prewarms, and plugins that are never selected are never imported.
+Each factory is cached so every job in a worker process shares one instance.
+"""
+
+import importlib
+import logging
+from functools import lru_cache
+from typing import Any
+
+from ..config.settings import DEEPGRAM_CONFIG, VAD_CONFIG, LIVEKIT_AGENT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def _plugin(name: str) -> Any:
+    """Import a livekit plugin module on first use."""
+    return importlib.import_module(f"livekit.plugins.{name}")
+
+
+@lru_cache(maxsize=None)
+def get_stt() -> Any:
+    """Shared Deepgram STT client."""
+    return _plugin("deepgram").STT(**DEEPGRAM_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def get_vad() -> Any:
+    """Shared Silero VAD model (loads ONNX weights, so call from prewarm)."""
+    return _plugin("silero").VAD.load(**VAD_CONFIG)
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str, temperature: float) -> Any:
+    """Shared OpenAI LLM client for the given model settings."""
+    return _plugin("openai").LLM(model=model, temperature=temperature)
+
+
+@lru_cache(maxsize=None)
+def get_tts(voice: str) -> Any:
+    """Shared OpenAI TTS client for the given voice."""
+    return _plugin("openai").TTS(voice=voice)
+
+
+@lru_cache(maxsize=None)
+def get_noise_cancellation() -> Any:
+    """
+    Noise-cancellation filter for room input, or None when disabled.
+    Requires LiveKit Cloud; falls back to None if the plugin can't load.
+    """
+    if not LIVEKIT_AGENT_CONFIG.get("noise_cancellation_enabled"):
+        return None
+    try:
+        return _plugin("noise_cancellation").BVC()
+    except Exception as e:
+        logger.warning("Noise cancellation unavailable: %s", e)
+        return None
@@ -10,5 +10,6 @@ __all__ = [
     'check_existing_appointments',
     'book_appointment',
     'cancel_appointment',
-    'reschedule_appointment'
+    'reschedule_appointment',
+    'get_current_time'
 ]
@@ -8,20 +8,29 @@ Defines all function tools for the dental clinic agent including:
 - Appointment rescheduling
 """
 
+import asyncio
+import hmac
 import logging
+import re
+import time
 import uuid
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from typing import Optional
+from datetime import date, datetime, timedelta
+from functools import lru_cache, wraps
+from typing import Any, Dict, NamedTuple, Optional
 from contextvars import ContextVar
 from livekit.agents.llm import function_tool
 from src.services.calcom import (
     get_availability as _get_availability,
     book_appointment as _book_appointment,
     cancel_appointment as _cancel_appointment,
-    find_booking_by_patient_info as _find_booking_by_patient_info
+    find_booking_by_patient_info as _find_booking_by_patient_info,
+    find_all_bookings_by_patient_info,
+    hold_slot as _hold_slot,
+    release_slot as _release_slot
 )
+from src.services import cache as shared_cache
 from src.services.database import get_db
+from src.config.settings import get_current_time as _get_current_time, get_zoneinfo, ADMIN_PASSWORD
 from src.models import get_memo, get_memo_context_for_prompt, clear_memo
 from src.config.prompts import get_available_doctors, should_ask_for_doctor, get_doctor_selection_options, get_default_doctor
 
@@ -33,22 +42,84 @@ _session_id_context: ContextVar[Optional[str]] = ContextVar('session_id', defaul
 # Context variable to store the last booked appointment details for quick cancel/reschedule
 _last_booking_context: ContextVar[Optional[dict]] = ContextVar('last_booking', default=None)
 
+# Clinic timezone used for patient-facing times
+_CLINIC_TZ = get_zoneinfo("Asia/Kolkata")
+
+# Opens the memo reminder appended to tool responses
+_MEMO_MARKER = "[SYSTEM MEMO:"
+
+# Cal.com booking errors that mean the slot is taken (so alternatives are offered)
+_SLOT_TAKEN_RE = re.compile(r'not available|booked|conflict|unavailable', re.IGNORECASE)
+
+# Stand-in for a booking without attendees (read-only)
+_NO_ATTENDEE: dict = {}
+
+# Service types recognised in booking titles/descriptions, by lowercase match
+_SERVICE_NAMES = {
+    service.lower(): service
+    for service in ('Cleaning', 'Checkup', 'Root Canal', 'Whitening', 'Emergency', 'Cosmetic')
+}
+_SERVICE_RE = re.compile('(' + '|'.join(map(re.escape, _SERVICE_NAMES)) + ')', re.IGNORECASE)
+
+# "H:MM" or "HH:MM" with an optional AM/PM suffix
+_BOOKING_TIME_RE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$')
+
+
+async def _remember_last_booking(booking: dict) -> None:
+    """Store the last booking in context and, when configured, the shared cache."""
+    _last_booking_context.set(booking)
+    session_id = _session_id_context.get()
+    if session_id and shared_cache.is_enabled():
+        await asyncio.to_thread(shared_cache.set_last_booking, session_id, booking)
+
+
+async def _recall_last_booking() -> Optional[dict]:
+    """
+    Last booking for this session: the context value if set, otherwise the
+    shared cache copy (survives separate tool tasks, reconnects and workers).
+    """
+    last_booking = _last_booking_context.get()
+    if last_booking is None:
+        session_id = _session_id_context.get()
+        if session_id and shared_cache.is_enabled():
+            last_booking = await asyncio.to_thread(shared_cache.get_last_booking, session_id)
+            if last_booking:
+                _last_booking_context.set(last_booking)
+    return last_booking
+
 
 def add_memo_context_to_response(base_response: str) -> str:
     """
     Enhance tool response with current memo context to remind the LLM of stored information.
     This helps the agent remember patient details across the conversation.
+    Responses that are empty or already carry a memo (chained tools) are returned as is.
     """
+    if not base_response or _MEMO_MARKER in base_response:
+        return base_response
     try:
         memo_context = get_memo_context_for_prompt()
         if memo_context:
             # Add memo context as a system reminder
-            return f"{base_response}\n\n[SYSTEM MEMO: {memo_context}]"
+            return f"{base_response}\n\n{_MEMO_MARKER} {memo_context}]"
         return base_response
     except Exception as e:
         logger.warning(f"Failed to get memo context: {e}")
         return base_response
 
+@lru_cache(maxsize=256)
+def _hhmm_to_ampm(hhmm: str) -> str:
+    """'13:30' -> '1:30 PM'."""
+    hour, minute = hhmm.split(":")
+    hour = int(hour)
+    return f"{hour % 12 or 12}:{minute} {'AM' if hour < 12 else 'PM'}"
+
+
+@lru_cache(maxsize=4)
+def _tomorrow(timezone_name: str, minute: int) -> date:
+    """Tomorrow's local date; keyed by the current minute so it's computed once per minute."""
+    return datetime.now(get_zoneinfo(timezone_name)).date() + timedelta(days=1)
+
+
 def parse_booking_time(user_input: str, reference_date: str = None, timezone_name: str = "Asia/Kolkata") -> str:
     """
     Parse user time input and convert to proper ISO format for booking.
@@ -60,27 +131,280 @@ def parse_booking_time(user_input: str, reference_date: str = None, timezone_nam
     
     Returns:
         ISO formatted datetime string
+    
+    Raises:
+        ValueError: If the time or reference date can't be parsed
     """
+    match = _BOOKING_TIME_RE.match(user_input)
+    if not match:
+        logger.error(f"Error parsing booking time '{user_input}': unrecognized format")
+        raise ValueError(f"Unrecognized time: {user_input!r}")
+    
+    hour, minute = int(match.group(1)), int(match.group(2))
+    meridiem = match.group(3)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid 12-hour time: {user_input!r}")
+        hour = hour % 12 + (12 if meridiem.lower() == "pm" else 0)
+    
+    tz = get_zoneinfo(timezone_name)
+    # If no reference date provided, use tomorrow
+    if not reference_date:
+        day = _tomorrow(timezone_name, int(time.time() // 60))
+    else:
+        # Extract date part if full ISO string is provided
+        day = date.fromisoformat(reference_date.split("T")[0])
+    
+    # datetime() raises ValueError for out-of-range hours/minutes
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).isoformat()
+
+
+class _CalcomResult(NamedTuple):
+    """Outcome of a Cal.com book/cancel call, classified once from its raw dict."""
+    ok: bool
+    uid: Optional[str]
+    error: Optional[str]  # Cal.com's error message when the API rejected the call
+    raw: Any
+
+
+def _book_result(raw: Any) -> _CalcomResult:
+    """Classify a book_appointment() result (a dry run counts as booked)."""
+    if isinstance(raw, BaseException):
+        return _CalcomResult(False, None, str(raw) or type(raw).__name__, raw)
+    if isinstance(raw, dict) and raw.get("status") == "error":
+        return _CalcomResult(False, None, raw.get("error", "Unknown error"), raw)
+    data = raw.get("data") if isinstance(raw, dict) else None
+    return _CalcomResult(True, data.get("uid") if isinstance(data, dict) else None, None, raw)
+
+
+def _cancel_result(raw: Any) -> _CalcomResult:
+    """
+    Classify a cancel_appointment() result. Only a reply with data (or an
+    explicit cancelled status) counts as cancelled; dry runs don't.
+    """
+    if isinstance(raw, BaseException):
+        return _CalcomResult(False, None, str(raw) or type(raw).__name__, raw)
+    if not isinstance(raw, dict):
+        return _CalcomResult(True, None, None, raw)
+    status = raw.get("status")
+    error = raw.get("error", "Unknown error") if status == "error" else None
+    ok = (
+        status not in ("error", "DRY_RUN") and "error" not in raw
+        and (bool(raw.get("data")) or status == "cancelled")
+    )
+    return _CalcomResult(ok, raw.get("booking_uid"), error, raw)
+
+
+async def _call_calcom(func, *args) -> Any:
+    """Run a blocking Cal.com call in a thread, returning (not raising) any exception."""
     try:
-        # If no reference date provided, use tomorrow
-        if not reference_date:
-            now = datetime.now(ZoneInfo(timezone_name))
-            tomorrow = now + timedelta(days=1)
-            reference_date = tomorrow.strftime("%Y-%m-%d")
-        else:
-            # Extract date part if full ISO string is provided
-            if "T" in reference_date:
-                reference_date = reference_date.split("T")[0]
-        # Parse time input and create full datetime
-        # This will handle various time formats
-        base_dt = datetime.strptime(f"{reference_date} {user_input}", "%Y-%m-%d %H:%M")
-        # Set timezone
-        tz_dt = base_dt.replace(tzinfo=ZoneInfo(timezone_name))
-        return tz_dt.isoformat()
+        return await asyncio.to_thread(func, *args)
+    except Exception as e:
+        return e
+
+
+def _format_booking(booking: dict, tz, email: str) -> dict:
+    """Appointment summary for one Cal.com booking, with its time shown in tz."""
+    start = booking.get('start') or ''
+    # A malformed start shouldn't hide the patient's other appointments
+    try:
+        time_text = datetime.fromisoformat(start.replace('Z', '+00:00')).astimezone(tz).strftime("%I:%M %p on %B %d, %Y").lstrip('0')
+    except (ValueError, TypeError, AttributeError):
+        logger.warning("[CHECK_APPOINTMENTS] Unparseable start %r for booking %s", start, booking.get('uid'))
+        time_text = start or 'an unknown time'
+    booking_id = booking.get('uid', 'N/A')
+    attendees = booking.get('attendees')
+    attendee = attendees[0] if attendees else _NO_ATTENDEE
+    
+    # Extract doctor info from the booking's host
+    user = booking.get('user')
+    doctor_name = user.get('name', 'Dr. Available') if isinstance(user, dict) else 'Dr. Available'
+    
+    # Check if service type is in title or description (one case-insensitive scan)
+    service_match = _SERVICE_RE.search(f"{booking.get('title') or ''}\n{booking.get('description') or ''}")
+    service_type = _SERVICE_NAMES[service_match.group(1).lower()] if service_match else 'General Appointment'
+    
+    return {
+        'name': attendee.get('name', 'Patient'),
+        'time': time_text,
+        'status': booking.get('status', 'Confirmed'),
+        'id': booking_id,
+        'uid': booking_id,
+        'start': start,
+        'email': email,
+        'phone': attendee.get('phone', ''),
+        'doctor': doctor_name,
+        'service': service_type
+    }
+
+
+# Background work started by tools; strong references keep tasks alive until done
+_background_tasks: set = set()
+# Cal.com UID -> background task still writing that booking's local row
+_record_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _run_after(pending: asyncio.Task, coro) -> None:
+    """Await coro once pending has finished (whether it succeeded or not)."""
+    await asyncio.wait({pending})
+    await coro
+
+
+def _run_in_background(coro, after: Optional[str] = None, records: Optional[str] = None) -> None:
+    """
+    Run a coroutine without awaiting it; failures are logged by the coroutine.
+    
+    Args:
+        after: Cal.com UID this write updates; waits for that row's pending insert
+        records: Cal.com UID whose row this write inserts, so later writes can wait on it
+    """
+    pending = _record_tasks.get(after) if after else None
+    if pending is not None:
+        coro = _run_after(pending, coro)
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    if records:
+        _record_tasks[records] = task
+        task.add_done_callback(
+            lambda t: _record_tasks.pop(records, None) if _record_tasks.get(records) is t else None
+        )
+
+
+async def drain_background_tasks(timeout: float) -> None:
+    """Wait up to timeout seconds for pending background work (e.g. DB records) to finish."""
+    if not _background_tasks:
+        return
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    if pending:
+        logger.warning("[BACKGROUND] %d task(s) still running after %ss", len(pending), timeout)
+
+
+def _store_booking_record(
+    session_id: Optional[str],
+    name: str,
+    phone: str,
+    email: str,
+    start_time: str,
+    duration_minutes: int,
+    booking_id: str
+) -> None:
+    """Store a confirmed Cal.com booking in the local database (blocking)."""
+    try:
+        logger.info("[BOOKING] Starting database storage...")
+        db = get_db()
+
+        logger.info(f"[BOOKING] session_id from context: {session_id}")
+
+        # CRITICAL: session_id must not be None
+        if not session_id:
+            logger.warning("[BOOKING] ⚠️  session_id is None in context, attempting fallback...")
+            # Fallback: Get the most recent session from database (any status)
+            try:
+                conn = db.get_connection()
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT session_id FROM sessions 
+                    ORDER BY start_time DESC 
+                    LIMIT 1
+                """)
+                result = cursor.fetchone()
+                cursor.close()
+                conn.close()
+
+                if result:
+                    session_id = result[0]
+                    logger.info(f"[BOOKING] ✓ Recovered session_id from database: {session_id}")
+                else:
+                    logger.error("[BOOKING] ✗✗✗ FATAL: No sessions found in database")
+                    return
+            except Exception as e:
+                logger.error(f"[BOOKING] ✗✗✗ Error recovering session_id: {e}")
+                return
+
+        # Parse appointment times
+        start_dt = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
+        end_dt = start_dt + timedelta(minutes=duration_minutes)
+
+        logger.info(f"[BOOKING] Storing booking: session_id={session_id}, phone={phone}, email={email}, start={start_dt}, end={end_dt}, calcom_uid={booking_id}")
+        # User, log linking, booking row (marked synced) and history in one transaction
+        created_booking_id = db.finalize_booking(
+            session_id=session_id,
+            name=name,
+            phone=phone,
+            email=email,
+            appointment_start=start_dt,
+            appointment_end=end_dt,
+            calcom_uid=booking_id,
+            notes=f"Booked via AI agent. Phone: {phone}, Email: {email}"
+        )
+        logger.info(f"[BOOKING] ✓✓✓ BOOKING STORED SUCCESSFULLY: {created_booking_id}")
     except Exception as e:
-        logger.error(f"Error parsing booking time '{user_input}': {e}")
-        # Return the original input if parsing fails
-        return user_input
+        logger.error(f"[BOOKING] ✗✗✗ Error storing booking in database: {e}", exc_info=True)
+
+
+def _store_cancellation(booking_uid: str, cancellation_reason: str) -> None:
+    """Mark a cancelled Cal.com booking as cancelled in the local database (blocking)."""
+    try:
+        db = get_db()
+        db.update_booking_status(booking_uid, 'cancelled', cancellation_reason)
+        logger.info(f"[CANCEL] Updated booking {booking_uid} status to cancelled in database")
+
+        # Mark sync as cancelled
+        try:
+            db.mark_calcom_sync(booking_uid, booking_uid, sync_status="cancelled")
+            logger.info(f"[CANCEL] ✓ Marked booking {booking_uid} sync status as cancelled")
+        except Exception as e:
+            logger.error(f"[CANCEL] Warning: Could not mark sync status: {e}")
+    except Exception as e:
+        logger.error(f"[CANCEL] Error updating booking status in database: {e}")
+
+
+def _store_reschedule(
+    session_id: Optional[str],
+    booking_uid: str,
+    new_booking_id: Optional[str],
+    patient_name: str,
+    patient_email: str,
+    phone: str,
+    reason: str,
+    current_appointment_time: str,
+    new_start_dt: datetime,
+    new_end_dt: datetime
+) -> None:
+    """Record a completed Cal.com reschedule in the local database (blocking)."""
+    try:
+        # ★ Mark OLD booking as CANCELLED and create the NEW record in one transaction ★
+        logger.info(f"[RESCHEDULE] Recording reschedule {booking_uid} → {new_booking_id} in database")
+        new_local_booking_id = get_db().record_reschedule(
+            session_id=session_id or f"sess_reschedule_{uuid.uuid4().hex[:8]}",
+            old_calcom_uid=booking_uid,
+            new_calcom_uid=new_booking_id,
+            name=patient_name,
+            phone=phone,
+            email=patient_email,
+            appointment_start=new_start_dt,
+            appointment_end=new_end_dt,
+            service_type=reason,
+            notes=f"Rescheduled from {current_appointment_time}"
+        )
+        logger.info(f"[RESCHEDULE] ✓ Marked old booking {booking_uid} as cancelled; new local booking: {new_local_booking_id}")
+    except Exception as e:
+        logger.error(f"[RESCHEDULE] Error updating database: {e}")
+
+
+@lru_cache(maxsize=64)
+def _closed_weekend_message(day: date) -> str:
+    """Reply for a weekend-only availability request (same day, same text)."""
+    return f"Our dental clinic is closed on weekends ({day:%A, %B %d}). We're open Monday through Friday, 10:00 AM to 2:00 PM (Asia/Kolkata timezone). Would you like me to check availability for a weekday instead?"
+
+
+@lru_cache(maxsize=64)
+def _no_slots_message(day: Optional[date], timezone_name: str) -> str:
+    """Reply when Cal.com has no free slots; day is None if the start couldn't be parsed."""
+    if day is not None:
+        return f"Unfortunately, there are no available appointment slots on {day:%A, %B %d}. This is likely because all time slots are already booked for that day. Our clinic operates Monday through Friday, 10:00 AM to 2:00 PM ({timezone_name}). Would you like to try a different date?"
+    return f"Unfortunately, there are no available appointment slots for the requested dates. Our clinic operates Monday through Friday, 10:00 AM to 2:00 PM ({timezone_name}). Would you like to try a different date?"
 
 
 # ============================================================================
@@ -108,34 +432,32 @@ async def get_availability(
     logger.info(f"[GET_AVAILABILITY] Called with: start={start}, end={end}, timezone={timezone_name}, duration={duration_minutes}")
     
     # Quick weekend check without date iteration
+    # Local start, parsed once and reused for the "no slots" message below
+    start_dt = None
     try:
-        tz = ZoneInfo(timezone_name)
+        tz = get_zoneinfo(timezone_name)
         start_dt = datetime.fromisoformat(start.replace("Z", "+00:00")).astimezone(tz)
         end_dt = datetime.fromisoformat(end.replace("Z", "+00:00")).astimezone(tz)
-        # Fast check: only check if the range is just 1-2 days and both are weekends
-        date_diff = (end_dt - start_dt).days
-        if date_diff <= 2:
-            start_weekday = start_dt.isoweekday()
-            if start_weekday in [6, 7]:  # Saturday or Sunday
-                start_day = start_dt.strftime("%A, %B %d")
-                return add_memo_context_to_response(f"Our dental clinic is closed on weekends ({start_day}). We're open Monday through Friday, 10:00 AM to 2:00 PM (Asia/Kolkata timezone). Would you like me to check availability for a weekday instead?")
+        # Fast check: skip Cal.com when every day in the range is a weekend day.
+        # Any three consecutive days include a weekday, so only 1-2 day ranges qualify.
+        # Weekdays are taken in the clinic's zone, hence the conversion above;
+        # an end at exactly midnight doesn't reach into that day.
+        first_day = start_dt.date()
+        last_day = max(first_day, (end_dt - timedelta(microseconds=1)).date())
+        if (last_day - first_day).days <= 1:
+            if first_day.isoweekday() >= 6 and last_day.isoweekday() >= 6:  # Saturday or Sunday
+                return add_memo_context_to_response(_closed_weekend_message(first_day))
     except Exception as e:
         logger.warning(f"Could not check weekend status: {e}")
     
     logger.info(f"[GET_AVAILABILITY] Calling CalCom API for range: {start} to {end}")
-    result = _get_availability(start, end, timezone_name, duration_minutes)
+    result = await asyncio.to_thread(_get_availability, start, end, timezone_name, duration_minutes)
     logger.info(f"[GET_AVAILABILITY] CalCom response: {result}")
     
     # If no slots returned, provide helpful message with explanation
     if isinstance(result, dict) and result.get("status") == "success":
         if not result.get("data") or all(len(slots) == 0 for slots in result.get("data", {}).values()):
-            try:
-                tz = ZoneInfo(timezone_name)
-                start_dt = datetime.fromisoformat(start.replace("Z", "+00:00")).astimezone(tz)
-                start_day = start_dt.strftime("%A, %B %d")
-                return f"Unfortunately, there are no available appointment slots on {start_day}. This is likely because all time slots are already booked for that day. Our clinic operates Monday through Friday, 10:00 AM to 2:00 PM ({timezone_name}). Would you like to try a different date?"
-            except:
-                return f"Unfortunately, there are no available appointment slots for the requested dates. Our clinic operates Monday through Friday, 10:00 AM to 2:00 PM ({timezone_name}). Would you like to try a different date?"
+            return _no_slots_message(start_dt.date() if start_dt is not None else None, timezone_name)
     
     return result
 
@@ -173,7 +495,7 @@ async def check_existing_appointments(
         return add_memo_context_to_response("I need your email address to look up your appointments securely. Could you please provide your email address?")
     
     # Store email in memo for future use
-    memo.update_patient_email(email)
+    memo.update_patient_email(email, prefetch=True)
     
     # Also store phone if provided
     if phone:
@@ -183,12 +505,9 @@ async def check_existing_appointments(
         # Use CalCom as ONLY source of truth - search for ACTIVE appointments
         logger.info(f"[CHECK_APPOINTMENTS] Searching CalCom for ACTIVE appointments: email={email}, name={patient_name}, phone={phone}")
         
-        from src.services.calcom import find_all_bookings_by_patient_info
-        from datetime import datetime
-        from zoneinfo import ZoneInfo
-        
         # CRITICAL: Use new function that returns ALL matching appointments, not just one
-        bookings = find_all_bookings_by_patient_info(
+        bookings = await asyncio.to_thread(
+            find_all_bookings_by_patient_info,
             patient_email=email,
             patient_name=patient_name,
             patient_phone=phone,
@@ -209,45 +528,7 @@ async def check_existing_appointments(
         
         # Format ALL appointments
         try:
-            appointment_list = []
-            
-            for booking in bookings:
-                appt_time = datetime.fromisoformat(booking.get('start', '').replace('Z', '+00:00'))
-                formatted_time = appt_time.astimezone(ZoneInfo("Asia/Kolkata")).strftime("%I:%M %p on %B %d, %Y").lstrip('0')
-                status = booking.get('status', 'Confirmed')
-                booking_id = booking.get('uid', 'N/A')
-                attendee_name = booking.get('attendees', [{}])[0].get('name', 'Patient')
-                
-                # Extract doctor info from event title or description
-                event_title = booking.get('title', '')
-                doctor_name = booking.get('user', {}).get('name', 'Dr. Available') if isinstance(booking.get('user'), dict) else 'Dr. Available'
-                
-                # Try to extract service type from title or description
-                service_type = None
-                description = booking.get('description', '')
-                title = booking.get('title', '')
-                
-                # Check if service type is in title or description
-                for service in ['Cleaning', 'Checkup', 'Root Canal', 'Whitening', 'Emergency', 'Cosmetic']:
-                    if service.lower() in title.lower() or service.lower() in description.lower():
-                        service_type = service
-                        break
-                
-                if not service_type:
-                    service_type = 'General Appointment'
-                
-                appointment_list.append({
-                    'name': attendee_name,
-                    'time': formatted_time,
-                    'status': status,
-                    'id': booking_id,
-                    'uid': booking_id,
-                    'start': booking.get('start', ''),
-                    'email': email,
-                    'phone': booking.get('attendees', [{}])[0].get('phone', ''),
-                    'doctor': doctor_name,
-                    'service': service_type
-                })
+            appointment_list = [_format_booking(booking, _CLINIC_TZ, email) for booking in bookings]
             
             # Store ALL appointments in memo and context
             memo.set_appointments(appointment_list)
@@ -282,9 +563,13 @@ async def check_existing_appointments(
                     'appointment_time': first_appt['start'],
                     'formatted_time': first_appt['time'],
                     'status': first_appt['status'],
-                    'all_appointments': appointment_list
+                    'all_appointments': appointment_list,
+                    # Lowercased name -> start (ISO) of their first listed appointment
+                    'start_by_name': {
+                        appt['name'].lower(): appt['start'] for appt in reversed(appointment_list)
+                    }
                 }
-                _last_booking_context.set(appointment_context)
+                await _remember_last_booking(appointment_context)
                 logger.info(f"[CHECK_APPOINTMENTS] Stored {len(appointment_list)} appointment(s) in context and memo")
             
             # Build response message
@@ -293,16 +578,17 @@ async def check_existing_appointments(
                 msg = f"✓ I found your ACTIVE appointment:\n{appt['name']}: {appt['time']}\nStatus: {appt['status']}\nID: {appt['id']}\n\nWould you like to reschedule or cancel it?"
             else:
                 # Multiple appointments - list them all
-                msg = f"✓ I found {len(appointment_list)} ACTIVE appointment(s) for you:\n\n"
-                for i, appt in enumerate(appointment_list, 1):
-                    msg += f"{i}. {appt['name']}: {appt['time']} (ID: {appt['id']})\n"
-                msg += f"\nWould you like to reschedule or cancel any of these appointments?"
+                lines = "".join(
+                    f"{i}. {appt['name']}: {appt['time']} (ID: {appt['id']})\n"
+                    for i, appt in enumerate(appointment_list, 1)
+                )
+                msg = f"✓ I found {len(appointment_list)} ACTIVE appointment(s) for you:\n\n{lines}\nWould you like to reschedule or cancel any of these appointments?"
             
             return add_memo_context_to_response(msg)
             
         except Exception as e:
             logger.warning(f"[CHECK_APPOINTMENTS] Error formatting appointment: {e}")
-            return add_memo_context_to_response(f"I found your appointment (ID: {booking.get('uid', 'N/A')}) at {booking.get('start', 'Unknown')}. Would you like to reschedule or cancel it?")
+            return add_memo_context_to_response(f"I found your appointment (ID: {bookings[0].get('uid', 'N/A')}) at {bookings[0].get('start', 'Unknown')}. Would you like to reschedule or cancel it?")
             
     except Exception as e:
         logger.error(f"[CHECK_APPOINTMENTS] Error checking appointments: {e}", exc_info=True)
@@ -368,35 +654,44 @@ async def book_appointment(
     
     logger.info(f"[BOOKING] ✓ Validation passed. Attempting to book appointment for {name} (doctor: {doctor}, reason: {reason}, phone: {phone}, email: {email}) at {start_time}")
     
-    # ★ NATURAL INTERIM RESPONSE ★
-    # Send an acknowledgment message that shows the agent is processing
-    try:
-        confirm_dt = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
-        slot_time = confirm_dt.strftime("%I:%M %p").lstrip('0')
-        interim_msg = f"Got it! Let me book that for you on {slot_time}..."
-        logger.info(f"[BOOKING] Sending interim response: {interim_msg}")
-    except:
-        interim_msg = "Got it! Let me book that for you..."
+    # Hold the slot so a caller on another worker can't book it at the same time
+    hold_owner = _session_id_context.get() if shared_cache.is_enabled() else None
+    held = True
+    if hold_owner:
+        try:
+            held = await asyncio.to_thread(_hold_slot, start_time, hold_owner)
+        except Exception as e:
+            logger.warning(f"[BOOKING] Could not hold slot {start_time}: {e}")
+            hold_owner = None
     
-    # Proceed with booking directly using the EXACT time from availability
-    result = _book_appointment(name, email, start_time, timezone_name, duration_minutes)
+    if held:
+        # Proceed with booking directly using the EXACT time from availability
+        result = await asyncio.to_thread(_book_appointment, name, email, start_time, timezone_name, duration_minutes)
+    else:
+        logger.info(f"[BOOKING] Slot {start_time} is held by another session")
+        result = {"status": "error", "error": "Slot is being booked by another caller and is not available"}
     
     logger.info(f"Booking result: {result}")
     
+    booked = _book_result(result)
+    
     # Check if booking failed 
-    if isinstance(result, dict) and result.get("status") == "error":
-        error_msg = result.get("error", "Unknown error")
+    if not booked.ok:
+        error_msg = booked.error
         logger.warning(f"Booking failed: {error_msg}")
+        if hold_owner and held:
+            await asyncio.to_thread(_release_slot, start_time, hold_owner)
         
         # Check if it's an availability issue
-        if any(keyword in error_msg.lower() for keyword in ["not available", "booked", "conflict", "unavailable"]):
+        if _SLOT_TAKEN_RE.search(error_msg):
             # Re-check availability to show current slots
             try:
                 requested_dt = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
                 day_start = requested_dt.replace(hour=0, minute=0, second=0, microsecond=0)
                 day_end = requested_dt.replace(hour=23, minute=59, second=59, microsecond=0)
                 
-                availability = _get_availability(
+                availability = await asyncio.to_thread(
+                    _get_availability,
                     day_start.isoformat(),
                     day_end.isoformat(),
                     timezone_name,
@@ -405,12 +700,15 @@ async def book_appointment(
                 
                 if availability.get("status") == "success" and availability.get("data"):
                     # Show all available slots
-                    remaining_slots = []
-                    for date_key, day_slots in availability.get("data", {}).items():
-                        for slot in day_slots:
-                            slot_time = datetime.fromisoformat(slot["start"].replace("Z", "+00:00"))
-                            time_str = slot_time.strftime("%I:%M %p").lstrip('0')
-                            remaining_slots.append(time_str)
+                    # Slot starts are local ISO strings, so HH:MM is read straight off them;
+                    # the window is under 24h, so it also identifies the slot that just failed
+                    requested_hhmm = requested_dt.astimezone(get_zoneinfo(timezone_name)).strftime("%H:%M")
+                    remaining_slots = [
+                        _hhmm_to_ampm(slot["start"][11:16])
+                        for day_slots in availability["data"].values()
+                        for slot in day_slots
+                        if slot["start"][11:16] != requested_hhmm
+                    ]
                     
                     if remaining_slots:
                         slots_text = "\n- ".join(remaining_slots)
@@ -441,87 +739,12 @@ async def book_appointment(
             'time': start_time
         })
         
-        # Store booking in database
-        try:
-            logger.info("[BOOKING] Starting database storage...")
-            db = get_db()
-            session_id = _session_id_context.get()  # Get from context variable
-            user_id = None
-            
-            logger.info(f"[BOOKING] session_id from context: {session_id}")
-            
-            # CRITICAL: session_id must not be None
-            if not session_id:
-                logger.warning("[BOOKING] ⚠️  session_id is None in context, attempting fallback...")
-                # Fallback: Get the most recent session from database (any status)
-                try:
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT session_id FROM sessions 
-                        ORDER BY start_time DESC 
-                        LIMIT 1
-                    """)
-                    result = cursor.fetchone()
-                    cursor.close()
-                    conn.close()
-                    
-                    if result:
-                        session_id = result[0]
-                        logger.info(f"[BOOKING] ✓ Recovered session_id from database: {session_id}")
-                    else:
-                        logger.error("[BOOKING] ✗✗✗ FATAL: No sessions found in database")
-                        return add_memo_context_to_response(f"I'm experiencing a technical issue with the booking system. Please start a new session and try again.")
-                except Exception as e:
-                    logger.error(f"[BOOKING] ✗✗✗ Error recovering session_id: {e}")
-                    return add_memo_context_to_response(f"I'm experiencing a technical issue with the booking system. Please try again later.")
-            
-            logger.info(f"[BOOKING] Creating/retrieving user for phone={phone}, email={email}")
-            
-            # Create user with real phone/email (now required, not optional)
-            user_id = db.get_or_create_user(phone=phone, name=name, email=email)
-            logger.info(f"[BOOKING] ✓ User created/retrieved: user_id={user_id}")
-            
-            # Link any past conversation logs to this user
-            if user_id and session_id:
-                db.link_conversation_logs_to_user(session_id, user_id)
-                logger.info(f"[BOOKING] ✓ Linked conversation logs to user {user_id}")
-            
-            if user_id:
-                logger.info(f"[BOOKING] Parsing appointment times from {start_time} with duration {duration_minutes} min")
-                # Parse appointment times
-                start_dt = datetime.fromisoformat(start_time.replace("Z", "+00:00"))
-                end_dt = start_dt + timedelta(minutes=duration_minutes)
-                
-                logger.info(f"[BOOKING] Creating booking record: session_id={session_id}, user_id={user_id}, start={start_dt}, end={end_dt}, calcom_uid={booking_id}")
-                # Create booking record with Cal.com UID
-                created_booking_id = db.create_booking(
-                    session_id=session_id,
-                    user_id=user_id,
-                    appointment_start=start_dt,
-                    appointment_end=end_dt,
-                    service_type="General Appointment",
-                    notes=f"Booked via AI agent. Phone: {phone}, Email: {email}",
-                    calcom_uid=booking_id
-                )
-                logger.info(f"[BOOKING] ✓✓✓ BOOKING STORED SUCCESSFULLY: {created_booking_id}")
-                
-                # Log booking to booking_history table for audit trail
-                logger.info(f"[BOOKING] Adding to booking history...")
-                db.log_booking_to_history(created_booking_id, appointment_start_time=start_dt)
-                logger.info(f"[BOOKING] ✓ Booking history logged")
-                
-                # NEW: Upsert user contact and mark sync
-                try:
-                    db.upsert_user_contact(name=name, phone=phone, email=email, calcom_uid=booking_id)
-                    db.mark_calcom_sync(created_booking_id, booking_id, sync_status="synced")
-                    logger.info(f"[BOOKING] ✓ Synced user contact and marked booking as synced with CalCom")
-                except Exception as e:
-                    logger.error(f"[BOOKING] Warning: Could not sync user contact or mark sync: {e}")
-            else:
-                logger.error("[BOOKING] ✗✗✗ Could not store booking: user_id is None")
-        except Exception as e:
-            logger.error(f"[BOOKING] ✗✗✗ Error storing booking in database: {e}", exc_info=True)
+        # Store booking in database in the background: Cal.com already holds the
+        # booking, so the confirmation doesn't wait on the local writes
+        _run_in_background(asyncio.to_thread(
+            _store_booking_record,
+            _session_id_context.get(), name, phone, email, start_time, duration_minutes, booking_id
+        ), records=booking_id)
         
         logger.info(f"[BOOKING] Booking process complete for {name}")
         
@@ -535,7 +758,7 @@ async def book_appointment(
             "duration_minutes": duration_minutes,
             "timezone": timezone_name
         }
-        _last_booking_context.set(booking_details)
+        await _remember_last_booking(booking_details)
         logger.info(f"[BOOKING] Stored booking details in context for quick cancellation/rescheduling")
         
         # Format the confirmation time nicely
@@ -552,8 +775,9 @@ async def book_appointment(
             msg += f" Your booking ID is {booking_id} — save this for any changes later. See you soon!"
             
             return msg
-        except:
-            return add_memo_context_to_response(f"Perfect! Your appointment has been successfully booked. Your booking ID is {booking_id} — save this for any changes later. See you soon!")
+        except (ValueError, TypeError):
+            # Like the main confirmation, the booking ID makes the memo reminder redundant
+            return f"Perfect! Your appointment has been successfully booked. Your booking ID is {booking_id} — save this for any changes later. See you soon!"
     else:
         logger.error(f"[BOOKING] ✗✗✗ Booking failed or returned unexpected format: {result}")
     
@@ -595,36 +819,34 @@ async def cancel_appointment(
     memo = get_memo()
     booking_to_cancel = None
     stored_email = memo.get_patient_email()
+    # Appointment we just booked or found, if any (read once; may hit the shared cache)
+    last_booking = await _recall_last_booking()
     
     if not patient_email:
         patient_email = stored_email
     
     # Also check context from last booking
     if not patient_email:
-        last_booking = _last_booking_context.get()
         if last_booking and last_booking.get('email'):
             patient_email = last_booking.get('email')
-            logger.info(f"[CANCEL] Retrieved email from last_booking context: {patient_email}")
+            logger.info("[CANCEL] Retrieved email from last_booking context: %s", patient_email)
     
     if not patient_email:
         return add_memo_context_to_response("I need your email address to cancel your appointment securely. Could you please provide your email address?")
     
-    logger.info(f"[CANCEL] Using email for cancellation: {patient_email} (stored={stored_email is not None})")
+    logger.info("[CANCEL] Using email for cancellation: %s (stored=%s)", patient_email, stored_email is not None)
     
     # Store email in memo for future operations
-    memo.update_patient_email(patient_email)
+    memo.update_patient_email(patient_email, prefetch=True)
     
     # Check if user is referring to the appointment we just booked or found
-    last_booking = _last_booking_context.get()
-    logger.info(f"[CANCEL] Reusing email from earlier appointment lookup: {patient_email}")
+    logger.info("[CANCEL] Reusing email from earlier appointment lookup: %s", patient_email)
     
     # CRITICAL: If patient_name is provided but appointment_time is not, find it from all_appointments
-    if patient_name and not appointment_time and last_booking and last_booking.get('all_appointments'):
-        for appt in last_booking['all_appointments']:
-            if appt.get('name', '').lower() == patient_name.lower():
-                appointment_time = appt.get('start')  # ISO format
-                logger.info(f"[CANCEL] Found appointment time for {patient_name} from context: {appointment_time}")
-                break
+    if patient_name and not appointment_time and last_booking and last_booking.get('start_by_name'):
+        appointment_time = last_booking['start_by_name'].get(patient_name.lower())  # ISO format
+        if appointment_time:
+            logger.info("[CANCEL] Found appointment time for %s from context: %s", patient_name, appointment_time)
     
     if not patient_name and not appointment_time and not booking_uid and last_booking:
         # User just wants to cancel the appointment we just booked
@@ -632,17 +854,32 @@ async def cancel_appointment(
         patient_name = last_booking.get('name')
         appointment_time = last_booking.get('appointment_time')
         booking_to_cancel = last_booking
-        logger.info(f"[CANCEL] Using recently booked appointment for cancellation: {booking_uid}")
+        logger.info("[CANCEL] Using recently booked appointment for cancellation: %s", booking_uid)
         # Proceed directly to cancellation - user already confirmed by saying "cancel"
     
+    # The appointment we just booked or found needs no second Cal.com lookup
+    # when it's for this email, name and time
+    skip_lookup = bool(
+        last_booking and last_booking.get('booking_id')
+        and booking_uid in (None, '', last_booking['booking_id'])
+        and (last_booking.get('email') or '').lower() == patient_email.lower()
+        and (not patient_name or (last_booking.get('name') or '').lower() == patient_name.lower())
+        and (not appointment_time or appointment_time == last_booking.get('appointment_time'))
+    )
+    if skip_lookup:
+        booking_uid = last_booking['booking_id']
+        booking_to_cancel = last_booking
+        logger.info("[CANCEL] ✓ Using booking %s from context, skipping CalCom lookup", booking_uid)
+    
     # Try to find booking in CalCom by email (primary), then filter by name and phone
-    if patient_email and appointment_time:
+    if patient_email and appointment_time and not skip_lookup:
         try:
-            logger.info(f"[CANCEL] Looking up ACTIVE booking in CalCom for {patient_email} (with optional name/phone filters)")
+            logger.info("[CANCEL] Looking up ACTIVE booking in CalCom for %s (with optional name/phone filters)", patient_email)
             
             # Use CalCom as ONLY source of truth
             # Email-first with optional name and phone filters
-            booking_to_cancel = _find_booking_by_patient_info(
+            booking_to_cancel = await asyncio.to_thread(
+                _find_booking_by_patient_info,
                 patient_email=patient_email,
                 patient_name=patient_name,
                 patient_phone=phone,
@@ -651,41 +888,32 @@ async def cancel_appointment(
             
             if booking_to_cancel:
                 booking_uid = booking_to_cancel.get('uid')  # Use CalCom UID
-                logger.info(f"[CANCEL] ✓ Found ACTIVE booking {booking_uid} in CalCom for {patient_email}")
+                logger.info("[CANCEL] ✓ Found ACTIVE booking %s in CalCom for %s", booking_uid, patient_email)
                 # Proceed directly to cancellation - booking is confirmed
             else:
                 return add_memo_context_to_response(f"I couldn't find an ACTIVE appointment for {patient_email} (name: {patient_name or 'any'}, phone: {phone or 'any'}) in our system. Could you please double-check? Or if you have your booking ID from the confirmation email, I can use that instead.")
         except Exception as e:
-            logger.error(f"[CANCEL] Error looking up booking in CalCom: {e}")
+            logger.error("[CANCEL] Error looking up booking in CalCom: %s", e)
             return add_memo_context_to_response("I'm having a small technical issue looking up your appointment. Could you provide your booking ID instead? You can find it in your confirmation email.")
     
     # If we have a booking UID (either from lookup or direct), cancel it
     if booking_uid and booking_uid.strip():
         # ★ NATURAL INTERIM RESPONSE ★
-        logger.info(f"[CANCEL] ✓ Found appointment. Now processing cancellation for booking {booking_uid}")
+        logger.info("[CANCEL] ✓ Found appointment. Now processing cancellation for booking %s", booking_uid)
         
-        result = _cancel_appointment(booking_uid, cancellation_reason)
+        cancelled = _cancel_result(await asyncio.to_thread(_cancel_appointment, booking_uid, cancellation_reason))
         
-        if isinstance(result, dict) and result.get("status") == "error":
-            error_msg = result.get("error", "Unknown error")
+        if cancelled.error is not None:
+            error_msg = cancelled.error
             if "not found" in error_msg.lower() or "invalid" in error_msg.lower():
                 return add_memo_context_to_response(f"I'm having trouble finding that booking. Could you double-check the email and date, or provide your booking ID from the confirmation email?")
             return add_memo_context_to_response("I'd love to help cancel your appointment, but I'm having a small technical issue. Our team at the clinic can definitely help - would you like me to connect you with them?")
         
-        # Update database status
-        try:
-            db = get_db()
-            db.update_booking_status(booking_uid, 'cancelled', cancellation_reason)
-            logger.info(f"[CANCEL] Updated booking {booking_uid} status to cancelled in database")
-            
-            # Mark sync as cancelled
-            try:
-                db.mark_calcom_sync(booking_uid, booking_uid, sync_status="cancelled")
-                logger.info(f"[CANCEL] ✓ Marked booking {booking_uid} sync status as cancelled")
-            except Exception as e:
-                logger.error(f"[CANCEL] Warning: Could not mark sync status: {e}")
-        except Exception as e:
-            logger.error(f"[CANCEL] Error updating booking status in database: {e}")
+        # Update database status in the background (Cal.com already cancelled it)
+        _run_in_background(
+            asyncio.to_thread(_store_cancellation, booking_uid, cancellation_reason),
+            after=booking_uid
+        )
         
         # Provide confirmation with details if we have them
         if booking_to_cancel:
@@ -739,45 +967,32 @@ async def reschedule_appointment(
     
     # CRITICAL: Validate ISO timestamp format - must have timezone
     try:
-        test_dt = datetime.fromisoformat(new_start_time.replace('Z', '+00:00'))
-        logger.info(f"[RESCHEDULE] ✓ Valid timestamp format: {new_start_time}")
+        new_dt = datetime.fromisoformat(new_start_time.replace('Z', '+00:00'))
+        new_end_dt = new_dt + timedelta(minutes=duration_minutes)
+        logger.info("[RESCHEDULE] ✓ Valid timestamp format: %s", new_start_time)
     except Exception as e:
-        logger.error(f"[RESCHEDULE] ✗ CRITICAL: Invalid timestamp {new_start_time}: {e}")
+        logger.error("[RESCHEDULE] ✗ CRITICAL: Invalid timestamp %s: %s", new_start_time, e)
         return add_memo_context_to_response(f"The time format seems incorrect. Please use one of the times from the available slots list. For example: use '12:00 PM' from the list, not a different format.")
     
-    # ★ AUTO-RETRIEVE EMAIL FROM MEMO ★
-    if not patient_email:
-        patient_email = memo.get_patient_email()
-        logger.info(f"[RESCHEDULE] Auto-retrieved email from memo: {patient_email}")
-    
-    # ★ AUTO-RETRIEVE PHONE FROM MEMO ★
-    if not phone:
-        phone = memo.get_patient_phone()
-        logger.info(f"[RESCHEDULE] Auto-retrieved phone from memo: {phone}")
-    
-    # ★ AUTO-RETRIEVE PATIENT NAME FROM MEMO ★
-    if not patient_name:
-        patient_name = memo.get_patient_name()
-        logger.info(f"[RESCHEDULE] Auto-retrieved name from memo: {patient_name}")
+    # ★ AUTO-RETRIEVE EMAIL, PHONE & NAME FROM MEMO; REUSE DOCTOR & REASON FROM ORIGINAL APPOINTMENT ★
+    filled = memo.fill_missing(
+        patient_email=patient_email, phone=phone, patient_name=patient_name, doctor=None, reason=None
+    )
+    patient_email, phone, patient_name = filled['patient_email'], filled['phone'], filled['patient_name']
+    logger.info("[RESCHEDULE] Patient details (args or memo): email=%s, phone=%s, name=%s", patient_email, phone, patient_name)
     
-    # ★ REUSE DOCTOR & REASON FROM ORIGINAL APPOINTMENT ★
-    doctor = memo.get_preferred_doctor()
-    reason = memo.get_appointment_reason()
+    doctor = filled['doctor'] or "Any Available"
+    reason = filled['reason'] or "General Appointment"
     
-    if not doctor:
-        doctor = "Any Available"
-    if not reason:
-        reason = "General Appointment"
-    
-    logger.info(f"[RESCHEDULE] Using doctor={doctor} and reason={reason} from original appointment (memo)")
+    logger.info("[RESCHEDULE] Using doctor=%s and reason=%s from original appointment (memo)", doctor, reason)
     
     # Initialize variables
     booking_uid = None
     booking_to_reschedule = None
     
     # ★ PRIORITY 1: Check if user wants to reschedule the RECENT booking ★
-    last_booking = _last_booking_context.get()
-    logger.info(f"[RESCHEDULE] Last booking context: {last_booking}")
+    last_booking = await _recall_last_booking()
+    logger.info("[RESCHEDULE] Last booking context: %s", last_booking)
     
     # If NO specific patient details provided, use the most recent booking
     if ((not patient_name or not current_appointment_time) and last_booking and 
@@ -791,19 +1006,20 @@ async def reschedule_appointment(
         booking_to_reschedule = last_booking
         
         # Update memo with retrieved info
-        memo.update_patient_email(patient_email)
+        memo.update_patient_email(patient_email, prefetch=True)
         memo.update_patient_name(patient_name)
         if phone:
             memo.update_patient_phone(phone)
         
-        logger.info(f"[RESCHEDULE] ✓ Using recent booking: {booking_uid} for {patient_name} ({patient_email})")
+        logger.info("[RESCHEDULE] ✓ Using recent booking: %s for %s (%s)", booking_uid, patient_name, patient_email)
         
     # ★ PRIORITY 2: Look up in CalCom if we have email + time ★
     elif patient_email and current_appointment_time:
         try:
-            logger.info(f"[RESCHEDULE] Looking up ACTIVE booking in CalCom for {patient_email}")
+            logger.info("[RESCHEDULE] Looking up ACTIVE booking in CalCom for %s", patient_email)
             
-            booking_to_reschedule = _find_booking_by_patient_info(
+            booking_to_reschedule = await asyncio.to_thread(
+                _find_booking_by_patient_info,
                 patient_email=patient_email,
                 patient_name=patient_name,
                 patient_phone=phone,
@@ -812,12 +1028,12 @@ async def reschedule_appointment(
             
             if booking_to_reschedule:
                 booking_uid = booking_to_reschedule.get('uid')
-                logger.info(f"[RESCHEDULE] ✓ Found ACTIVE booking {booking_uid} in CalCom for {patient_email}")
+                logger.info("[RESCHEDULE] ✓ Found ACTIVE booking %s in CalCom for %s", booking_uid, patient_email)
             else:
                 return add_memo_context_to_response(f"I couldn't find an active appointment for {patient_email}. Could you double-check the details?")
                 
         except Exception as e:
-            logger.error(f"[RESCHEDULE] Error looking up booking: {e}")
+            logger.error("[RESCHEDULE] Error looking up booking: %s", e)
             return add_memo_context_to_response("I'm having trouble looking up your appointment. Could you try again?")
     
     # ★ PRIORITY 3: Need more info ★
@@ -833,165 +1049,161 @@ async def reschedule_appointment(
     # Use the booking_uid as CalCom UID (from our CalCom lookup)
     calcom_uid = booking_uid
     
-    logger.info(f"[RESCHEDULE] Proceeding with reschedule. CalCom UID: {calcom_uid}")
+    logger.info("[RESCHEDULE] Proceeding with reschedule. CalCom UID: %s", calcom_uid)
     
-    # ★ NATURAL INTERIM RESPONSE ★
     try:
-        new_dt = datetime.fromisoformat(new_start_time.replace("Z", "+00:00"))
-        new_slot_time = new_dt.strftime("%I:%M %p").lstrip('0')
-        interim_reschedule_msg = f"Got it! Let me reschedule your appointment to {new_slot_time}..."
-        logger.info(f"[RESCHEDULE] Interim response: {interim_reschedule_msg}")
-    except:
-        interim_reschedule_msg = "Got it! Let me reschedule that for you..."
-    
-    # Proceed with rescheduling if we have all required info
-    if not booking_uid:
-        return add_memo_context_to_response("I need to find your current appointment first. Could you please provide your name and current appointment time?")
-    
-    # Use the booking_uid as CalCom UID (from our CalCom lookup)
-    calcom_uid = booking_uid
-    
-    logger.info(f"[RESCHEDULE] Proceeding with reschedule. CalCom UID: {calcom_uid}")
-    
-    # ★ NATURAL INTERIM RESPONSE ★
-    try:
-        new_dt = datetime.fromisoformat(new_start_time.replace("Z", "+00:00"))
-        new_slot_time = new_dt.strftime("%I:%M %p").lstrip('0')
-        interim_reschedule_msg = f"Got it! Let me reschedule your appointment to {new_slot_time}..."
-        logger.info(f"[RESCHEDULE] Interim response: {interim_reschedule_msg}")
-    except:
-        interim_reschedule_msg = "Got it! Let me reschedule that for you..."
-    
-    try:
-        # First, cancel the existing appointment using Cal.com UID
-        logger.info(f"[RESCHEDULE] Cancelling old booking {booking_uid} (calcom_uid={calcom_uid})")
-        cancel_result = _cancel_appointment(calcom_uid, "Rescheduled to new time")
+        # CRITICAL: Detect if using old appointment time (causes duplicates)
+        # Cal.com bookings carry 'start'; the last-booking context stores 'appointment_time'
+        old_time = (
+            booking_to_reschedule.get('start') or booking_to_reschedule.get('appointment_time')
+            if booking_to_reschedule else None
+        )
+        old_dt = None
+        if old_time:
+            try:
+                old_dt = datetime.fromisoformat(old_time.replace('Z', '+00:00')).astimezone(_CLINIC_TZ)
+            except ValueError:
+                logger.warning("[RESCHEDULE] Could not parse current appointment time %s", old_time)
+        if old_dt:
+            # Cal.com returns UTC ('Z') while slots are local, so compare both in clinic time
+            old_local = old_dt.isoformat()
+            new_local = new_dt.astimezone(_CLINIC_TZ).isoformat()
+            old_hour = old_local[11:16]
+            new_hour = new_local[11:16]
+            if old_hour == new_hour and old_local[:10] == new_local[:10]:
+                logger.error("[RESCHEDULE] ✗✗✗ DUPLICATE ALERT: Using old time %s! Old: %s, New: %s", old_hour, old_time, new_start_time)
+                return add_memo_context_to_response(f"I notice you're choosing the same time (:{new_hour}) as your current appointment. This causes duplicates. Please choose a different time from the available slots.")
+            logger.info("[RESCHEDULE] ✓ Time changed: %s → %s", old_hour, new_hour)
         
-        # ★ CRITICAL: Proper error checking for cancellation response ★
-        # Check for error status OR missing data OR error key
-        is_cancel_error = (
-            isinstance(cancel_result, dict) and (
-                cancel_result.get("status") == "error" or
-                cancel_result.get("status") == "DRY_RUN" or
-                "error" in cancel_result or
-                (not cancel_result.get("data") and cancel_result.get("status") != "cancelled")
+        if old_dt and abs(new_dt - old_dt) < timedelta(minutes=duration_minutes):
+            # The old and new slots overlap, so Cal.com would reject the new booking
+            # until the old one is gone: cancel first, then book
+            logger.info("[RESCHEDULE] Cancelling old booking %s (calcom_uid=%s), then booking overlapping %s", booking_uid, calcom_uid, new_start_time)
+            cancel_result = _cancel_result(await _call_calcom(_cancel_appointment, calcom_uid, "Rescheduled to new time"))
+            book_result = (
+                _book_result(await _call_calcom(_book_appointment, patient_name, patient_email, new_start_time, timezone_name, duration_minutes))
+                if cancel_result.ok else _CalcomResult(False, None, "Not attempted", None)
             )
-        )
+        else:
+            # Cancel the existing appointment (Cal.com UID) and book the new time concurrently;
+            # they're independent once the new time is chosen, and the slot isn't left open
+            # for someone else while the cancel round-trip runs
+            logger.info("[RESCHEDULE] Cancelling old booking %s (calcom_uid=%s) and booking %s", booking_uid, calcom_uid, new_start_time)
+            cancel_raw, book_raw = await asyncio.gather(
+                asyncio.to_thread(_cancel_appointment, calcom_uid, "Rescheduled to new time"),
+                asyncio.to_thread(_book_appointment, patient_name, patient_email, new_start_time, timezone_name, duration_minutes),
+                # A timeout on one call must not hide the other's outcome (e.g. a booking to roll back)
+                return_exceptions=True,
+            )
+            # ★ CRITICAL: Proper error checking (error status, error key, or missing data) ★
+            cancel_result, book_result = _cancel_result(cancel_raw), _book_result(book_raw)
         
-        if is_cancel_error:
-            logger.error(f"[RESCHEDULE] Failed to cancel booking: {cancel_result}")
+        if not cancel_result.ok:
+            logger.error("[RESCHEDULE] Failed to cancel booking: %s", cancel_result.raw)
+            # Undo the new booking so the patient isn't left with two appointments
+            if book_result.uid:
+                logger.info("[RESCHEDULE] Rolling back new booking %s", book_result.uid)
+                rollback_result = _cancel_result(await _call_calcom(_cancel_appointment, book_result.uid, "Reschedule rolled back"))
+                if not rollback_result.ok:
+                    logger.error("[RESCHEDULE] ✗ Failed to roll back new booking %s; patient may hold both %s and %s: %s", book_result.uid, booking_uid, book_result.uid, rollback_result.raw)
+                    return add_memo_context_to_response(f"I couldn't finish moving your appointment (ID: {booking_uid}), and you may now have two bookings. Let me connect you with our team so they can sort it out.")
             return add_memo_context_to_response(f"I found your appointment (ID: {booking_uid}), but I'm having difficulty cancelling it for rescheduling. Would you like me to connect you with our team?")
         
-        logger.info(f"[RESCHEDULE] ✓ Cancelled old booking {booking_uid}")
-        
-        # Then, book the new appointment
-        logger.info(f"[RESCHEDULE] Booking new appointment at {new_start_time}")
+        logger.info("[RESCHEDULE] ✓ Cancelled old booking %s", booking_uid)
         
-        # CRITICAL: Detect if using old appointment time (causes duplicates)
-        if booking_to_reschedule:
-            old_time = booking_to_reschedule.get('start')
+        if not book_result.ok:
+            logger.error("[RESCHEDULE] Failed to book new time: %s", book_result.error)
+            # Put the original appointment back rather than leave the patient with none
             if old_time:
-                old_time_obj = datetime.fromisoformat(old_time.replace('Z', '+00:00'))
-                new_time_obj = datetime.fromisoformat(new_start_time.replace('Z', '+00:00'))
-                old_hour = old_time_obj.strftime('%H:%M')
-                new_hour = new_time_obj.strftime('%H:%M')
-                if old_hour == new_hour:
-                    logger.error(f"[RESCHEDULE] ✗✗✗ DUPLICATE ALERT: Using old time {old_hour}! Old: {old_time}, New: {new_start_time}")
-                    return add_memo_context_to_response(f"I notice you're choosing the same time (:{new_hour}) as your current appointment. This causes duplicates. Please choose a different time from the available slots.")
-                logger.info(f"[RESCHEDULE] ✓ Time changed: {old_hour} → {new_hour}")
-        
-        book_result = _book_appointment(patient_name, patient_email, new_start_time, timezone_name, duration_minutes)
-        
-        if isinstance(book_result, dict) and book_result.get("status") == "error":
-            error_msg = book_result.get("error", "Unknown error")
-            logger.error(f"[RESCHEDULE] Failed to book new time: {error_msg}")
+                restore_result = _book_result(await _call_calcom(_book_appointment, patient_name, patient_email, old_time, timezone_name, duration_minutes))
+                if restore_result.ok:
+                    logger.info("[RESCHEDULE] ✓ Restored original appointment at %s", old_time)
+                    # The restored booking has a new Cal.com UID; record it like a reschedule
+                    if old_dt:
+                        _run_in_background(asyncio.to_thread(
+                            _store_reschedule,
+                            _session_id_context.get(), booking_uid, restore_result.uid,
+                            patient_name, patient_email, phone, reason, old_time,
+                            old_dt, old_dt + timedelta(minutes=duration_minutes)
+                        ), after=booking_uid, records=restore_result.uid)
+                    # Later cancel/reschedule calls must target the restored booking, not the cancelled one
+                    if restore_result.uid and booking_to_reschedule.get('booking_id'):
+                        await _remember_last_booking({**booking_to_reschedule, 'booking_id': restore_result.uid})
+                    return add_memo_context_to_response("The new time slot is no longer available, so I've kept your original appointment time. Would you like to choose another time?")
+                logger.error("[RESCHEDULE] Failed to restore original appointment: %s", restore_result.error)
             return add_memo_context_to_response(f"I was able to cancel your old appointment (ID: {booking_uid}), but the new time slot is no longer available. Would you like to choose another time?")
         
-        logger.info(f"[RESCHEDULE] ✓ Successfully booked new appointment")
+        logger.info("[RESCHEDULE] ✓ Successfully booked new appointment")
         
-        # Extract new booking ID from result
-        new_booking_id = None
-        if isinstance(book_result, dict) and book_result.get("data"):
-            new_booking_id = book_result.get("data", {}).get("uid")
+        new_booking_id = book_result.uid
         
         # ★ CRITICAL: Update database properly for the reschedule ★
-        try:
-            db = get_db()
-            new_start_dt = datetime.fromisoformat(new_start_time.replace("Z", "+00:00"))
-            new_end_dt = new_start_dt + timedelta(minutes=duration_minutes)
-            
-            # ★ Mark OLD booking as CANCELLED (this is what was missing!) ★
-            logger.info(f"[RESCHEDULE] Marking OLD booking {booking_uid} as cancelled in database")
-            cursor_conn = db.get_connection()
-            cursor_db = cursor_conn.cursor()
-            cursor_db.execute(
-                "UPDATE bookings SET status = %s, notes = %s WHERE calcom_uid = %s OR booking_id = %s",
-                ('cancelled', 'Cancelled due to reschedule by patient', booking_uid, booking_uid)
-            )
-            cursor_conn.commit()
-            cursor_db.close()
-            cursor_conn.close()
-            logger.info(f"[RESCHEDULE] ✓ Marked old booking {booking_uid} as cancelled")
-            
-            # ★ Create NEW booking record with new Cal.com UID ★
-            if new_booking_id and patient_name and patient_email:
-                logger.info(f"[RESCHEDULE] Creating NEW booking record with calcom_uid={new_booking_id}")
-                try:
-                    # Get or create user for the new booking
-                    user_id = db.get_or_create_user(phone=phone, name=patient_name, email=patient_email)
-                    session_id = _session_id_context.get() or f"sess_reschedule_{uuid.uuid4().hex[:8]}"
-                    
-                    # Create new booking entry
-                    new_local_booking_id = db.create_booking(
-                        session_id=session_id,
-                        user_id=user_id,
-                        appointment_start=new_start_dt,
-                        appointment_end=new_end_dt,
-                        service_type=reason,
-                        notes=f"Rescheduled from {current_appointment_time}",
-                        calcom_uid=new_booking_id
-                    )
-                    logger.info(f"[RESCHEDULE] ✓ Created NEW local booking record: {new_local_booking_id} with calcom_uid={new_booking_id}")
-                    new_booking_id = new_local_booking_id
-                except Exception as e:
-                    logger.error(f"[RESCHEDULE] Warning: Could not create new booking record: {e}")
-            
-            # Update user contact
-            try:
-                db.upsert_user_contact(name=patient_name, phone=phone, email=patient_email, calcom_uid=new_booking_id or booking_uid)
-                db.mark_calcom_sync(new_booking_id or booking_uid, new_booking_id or booking_uid, sync_status="rescheduled")
-                logger.info(f"[RESCHEDULE] ✓ Synced user contact and marked booking as rescheduled")
-            except Exception as e:
-                logger.error(f"[RESCHEDULE] Warning: Could not sync user contact or mark sync: {e}")
-        except Exception as e:
-            logger.error(f"[RESCHEDULE] Error updating database: {e}")
+        # Runs in the background; both Cal.com changes are already done
+        _run_in_background(asyncio.to_thread(
+            _store_reschedule,
+            _session_id_context.get(), booking_uid, new_booking_id, patient_name, patient_email,
+            phone, reason, current_appointment_time, new_dt, new_end_dt
+        ), after=booking_uid, records=new_booking_id)
         
         # Provide confirmation
-        try:
-            new_time_formatted = datetime.fromisoformat(new_start_time.replace("Z", "+00:00")).astimezone(ZoneInfo("Asia/Kolkata")).strftime("%A, %B %d at %I:%M %p").lstrip('0')
-        except:
-            new_time_formatted = new_start_time
+        new_time_formatted = new_dt.astimezone(_CLINIC_TZ).strftime("%A, %B %d at %I:%M %p").lstrip('0')
         
         confirmation = f"Perfect! All set — your appointment has been rescheduled to {new_time_formatted}. Your old appointment has been cancelled, and you'll get confirmation shortly. Is there anything else?"
         
-        logger.info(f"[RESCHEDULE] ✓ Reschedule complete: {booking_uid} → {new_booking_id}")
+        logger.info("[RESCHEDULE] ✓ Reschedule complete: %s → %s", booking_uid, new_booking_id)
         return confirmation
         
     except Exception as e:
-        logger.error(f"[RESCHEDULE] Unexpected error during reschedule: {e}")
+        logger.error("[RESCHEDULE] Unexpected error during reschedule: %s", e)
         return add_memo_context_to_response("I'm experiencing a technical issue with the rescheduling. Please try again or contact our team for assistance.")
     
     # Need more information
     return add_memo_context_to_response(f"I need a bit more information to complete the reschedule. Could you please provide your email address?")
 
 
+# ============================================================================
+# UTILITY TOOLS
+# ============================================================================
+
+@function_tool(
+    description="Get the current date and time at the clinic. Use this when you need the exact current time, e.g. to check whether a same-day slot is still ahead or to resolve 'today' and 'tomorrow'."
+)
+async def get_current_time():
+    """
+    Get the current clinic time.
+    Kept out of the system prompt so the prompt stays cacheable across sessions.
+    """
+    current_time = _get_current_time()
+    logger.info(f"[GET_CURRENT_TIME] {current_time}")
+    return current_time
+
+
 # ============================================================================
 # ADMIN TOOLS
 # ============================================================================
 
+def require_admin(func):
+    """
+    Reject calls whose `password` doesn't match ADMIN_PASSWORD before the tool body runs.
+    Every call is rejected while ADMIN_PASSWORD is unset or empty. Compared in
+    constant time; keeps the tool's signature for function_tool.
+    """
+    @wraps(func)
+    async def wrapper(password: str, *args, **kwargs):
+        if not ADMIN_PASSWORD:
+            logger.warning("[ADMIN] Rejected admin call: ADMIN_PASSWORD is not configured")
+            return "Access denied: Admin access is not configured."
+        if not hmac.compare_digest((password or "").encode(), ADMIN_PASSWORD.encode()):
+            logger.warning("[ADMIN] Unauthorized access attempt with wrong password")
+            return "Access denied: Invalid admin password."
+        return await func(password, *args, **kwargs)
+    return wrapper
+
+
 @function_tool(
     description="Admin control tool for system maintenance. Validates admin password and provides cleanup options for database tables, memo memory, and sessions. Only available to authorized admin users. Parameters: password (required), action (optional - 'menu' to show options, 'confirm_cleanup' to execute cleanup after confirmation)"
 )
+@require_admin
 async def admin_cleanup(
     password: str,
     action: str = "menu"
@@ -1000,19 +1212,12 @@ async def admin_cleanup(
     Admin cleanup control tool.
     
     Args:
-        password: Admin password (must be "admin123")
+        password: Admin password (checked against ADMIN_PASSWORD by @require_admin)
         action: "menu" to show cleanup options, "confirm_cleanup" to execute cleanup
     
     Returns:
         Menu with cleanup confirmation or cleanup status
     """
-    # Validate password
-    ADMIN_PASSWORD = "admin123"
-    
-    if password != ADMIN_PASSWORD:
-        logger.warning(f"[ADMIN_CLEANUP] Unauthorized access attempt with wrong password")
-        return "Access denied: Invalid admin password."
-    
     logger.info(f"[ADMIN_CLEANUP] Admin verified. Action: {action}")
     
     # Show cleanup menu
@@ -1059,22 +1264,28 @@ Please say "yes, proceed with cleanup" to continue."""
             cleared_tables = []
             errors = []
             
-            # Clear all database tables
-            for table in tables_to_clear:
+            # Clear all database tables on one pooled connection.
+            # TRUNCATE drops the table's data in one step and resets AUTO_INCREMENT;
+            # InnoDB refuses it on FK-referenced tables unless checks are off.
+            conn = db.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+                for table in tables_to_clear:
+                    try:
+                        cursor.execute(f"TRUNCATE TABLE {table}")
+                        cleared_tables.append(table)
+                        logger.info(f"[ADMIN_CLEANUP] Cleared {table}")
+                    except Exception as e:
+                        error_msg = f"{table}: {str(e)}"
+                        errors.append(error_msg)
+                        logger.error(f"[ADMIN_CLEANUP] Error clearing {table}: {e}")
+            finally:
                 try:
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(f"DELETE FROM {table}")
-                    cursor.execute(f"ALTER TABLE {table} AUTO_INCREMENT = 1")
-                    conn.commit()
+                    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+                finally:
                     cursor.close()
                     conn.close()
-                    cleared_tables.append(table)
-                    logger.info(f"[ADMIN_CLEANUP] Cleared {table}")
-                except Exception as e:
-                    error_msg = f"{table}: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(f"[ADMIN_CLEANUP] Error clearing {table}: {e}")
             
             # Clear memo memory
             try: